@@ -0,0 +1,46 @@
+"""
+Batch ID helpers - Parse "batch_NNN" identifiers once and reuse the result
+"""
+from functools import lru_cache
+from typing import Optional
+
+
+@lru_cache(maxsize=4096)
+def parse_batch_num(batch_id: Optional[str]) -> Optional[int]:
+    """
+    Parse the batch number from IDs like "batch_005" or "batch_005_partial".
+    
+    Args:
+        batch_id: Batch identifier
+        
+    Returns:
+        Batch number, or None for IDs in an unknown format
+    """
+    if not batch_id:
+        return None
+    number = batch_id.partition('_partial')[0].partition('_')[2]
+    if number.isdecimal():
+        return int(number)
+    return None
+
+
+@lru_cache(maxsize=4096)
+def parse_committed_batch_num(batch_id: Optional[str]) -> Optional[int]:
+    """
+    Parse the batch number from committed IDs like "batch_005" only.
+    
+    Partial IDs such as "batch_006_partial" are not resumable checkpoints
+    and parse to None, unlike parse_batch_num.
+    
+    Args:
+        batch_id: Batch identifier
+        
+    Returns:
+        Batch number, or None for partial or unknown IDs
+    """
+    if not batch_id:
+        return None
+    number = batch_id.partition('_')[2]
+    if number.isdecimal():
+        return int(number)
+    return None
@@ -1,10 +1,17 @@
 """
 CheckpointManager - Track DB-persisted chunk IDs with DB state awareness
 """
-from dataclasses import dataclass, field
+import json
+import os
+import struct
+import time
+from dataclasses import dataclass
+from functools import cached_property
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
+from docs_rag.batch_ids import parse_committed_batch_num
+
 
 class CorruptCheckpointError(Exception):
     """Raised when checkpoint data is corrupt or invalid"""
@@ -16,14 +23,56 @@ class ConflictError(Exception):
     pass
 
 
-@dataclass
+# Binary checkpoint record: version, total_persisted, timestamp_ns,
+# db_count_matches, then the lengths of the UTF-8 last_batch_id and status
+# strings that follow the header
+_RECORD_VERSION = 1
+_RECORD_HEADER = struct.Struct('<BqqBHH')
+
+
+def _to_ns(timestamp: datetime) -> int:
+    """Convert a datetime to integer nanoseconds since the epoch"""
+    return int(timestamp.replace(microsecond=0).timestamp()) * 1_000_000_000 + timestamp.microsecond * 1000
+
+
+@dataclass(slots=True, init=False)
 class Checkpoint:
-    """Represents a checkpoint state"""
+    """
+    Represents a checkpoint state.
+    
+    The time is kept as integer nanoseconds since the epoch (timestamp_ns);
+    a datetime may still be passed as ``timestamp`` and is read back through
+    the ``timestamp`` property.
+    """
     last_batch_id: str
     total_persisted: int
     status: str  # 'committed', 'pending', etc.
-    timestamp: datetime = field(default_factory=datetime.now)
-    db_count_matches: bool = False
+    db_count_matches: bool
+    timestamp_ns: int
+    
+    def __init__(
+        self,
+        last_batch_id: str,
+        total_persisted: int,
+        status: str,
+        timestamp: Optional[datetime] = None,
+        db_count_matches: bool = False,
+        timestamp_ns: Optional[int] = None
+    ):
+        self.last_batch_id = last_batch_id
+        self.total_persisted = total_persisted
+        self.status = status
+        self.db_count_matches = db_count_matches
+        if timestamp_ns is None:
+            timestamp_ns = _to_ns(timestamp) if timestamp is not None else time.time_ns()
+        self.timestamp_ns = timestamp_ns
+    
+    @property
+    def timestamp(self) -> datetime:
+        """Checkpoint time as a local datetime"""
+        return datetime.fromtimestamp(self.timestamp_ns // 1_000_000_000).replace(
+            microsecond=self.timestamp_ns // 1000 % 1_000_000
+        )
     
     def to_dict(self) -> Dict[str, Any]:
         """Serialize checkpoint to dictionary"""
@@ -31,29 +80,72 @@ class Checkpoint:
             "last_batch_id": self.last_batch_id,
             "total_persisted": self.total_persisted,
             "status": self.status,
-            "timestamp": self.timestamp.isoformat() if isinstance(self.timestamp, datetime) else self.timestamp,
+            "timestamp_ns": self.timestamp_ns,
             "db_count_matches": self.db_count_matches
         }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Checkpoint':
         """Deserialize checkpoint from dictionary"""
+        # Older checkpoints carry an ISO-8601 "timestamp" instead of timestamp_ns
         timestamp = data.get("timestamp")
         if isinstance(timestamp, str):
             timestamp = datetime.fromisoformat(timestamp)
-        elif timestamp is None:
-            timestamp = datetime.now()
-            
+        
         return cls(
             last_batch_id=data["last_batch_id"],
             total_persisted=data["total_persisted"],
             status=data["status"],
-            timestamp=timestamp,
-            db_count_matches=data.get("db_count_matches", False)
+            timestamp=timestamp if isinstance(timestamp, datetime) else None,
+            db_count_matches=data.get("db_count_matches", False),
+            timestamp_ns=data.get("timestamp_ns")
+        )
+    
+    def to_bytes(self) -> bytes:
+        """Serialize checkpoint to a length-prefixed binary record"""
+        batch_id = self.last_batch_id.encode('utf-8')
+        status = self.status.encode('utf-8')
+        return _RECORD_HEADER.pack(
+            _RECORD_VERSION,
+            self.total_persisted,
+            self.timestamp_ns,
+            self.db_count_matches,
+            len(batch_id),
+            len(status)
+        ) + batch_id + status
+    
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Checkpoint':
+        """
+        Deserialize checkpoint from a binary record.
+        
+        Raises:
+            CorruptCheckpointError: If the record is truncated or of an unknown version
+        """
+        if len(data) < _RECORD_HEADER.size:
+            raise CorruptCheckpointError("Checkpoint record is truncated")
+        version, total, timestamp_ns, matches, batch_id_len, status_len = \
+            _RECORD_HEADER.unpack_from(data)
+        if version != _RECORD_VERSION:
+            raise CorruptCheckpointError(f"Unknown checkpoint record version: {version}")
+        
+        offset = _RECORD_HEADER.size
+        if len(data) != offset + batch_id_len + status_len:
+            raise CorruptCheckpointError("Checkpoint record length mismatch")
+        batch_id = data[offset:offset + batch_id_len].decode('utf-8')
+        status = data[offset + batch_id_len:].decode('utf-8')
+        
+        return cls(
+            last_batch_id=batch_id,
+            total_persisted=total,
+            status=status,
+            db_count_matches=bool(matches),
+            timestamp_ns=timestamp_ns
         )
 
 
-@dataclass
+# Not slotted: cached_property needs an instance __dict__
+@dataclass(frozen=True)
 class RecoveryPoint:
     """Represents a point to resume from"""
     last_batch_id: Optional[str]
@@ -62,25 +154,18 @@ class RecoveryPoint:
     
     def __post_init__(self):
         if self.can_resume is None:
-            self.can_resume = self.last_batch_id is not None
+            object.__setattr__(self, 'can_resume', self.last_batch_id is not None)
     
-    @property
+    @cached_property
     def resume_from(self) -> Optional[str]:
         """Get the next batch ID to resume from"""
         if not self.last_batch_id:
             return None
-        # Parse batch_001 format
-        try:
-            parts = self.last_batch_id.split('_')
-            if len(parts) == 2 and parts[1].isdigit():
-                next_num = int(parts[1]) + 1
-                return f"batch_{next_num:03d}"
-        except (ValueError, IndexError):
-            pass
-        return None
+        batch_num = parse_committed_batch_num(self.last_batch_id)
+        return f"batch_{batch_num + 1:03d}" if batch_num is not None else None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class ConsistencyReport:
     """Report on checkpoint vs DB consistency"""
     consistent: bool
@@ -92,7 +177,7 @@ class CheckpointManager:
     Manages checkpoints with:
     - DB-persisted chunk ID tracking
     - DB state awareness
-    - JSON checkpoint file with atomic writes
+    - Binary checkpoint file with atomic writes
     - Resume from any batch
     """
     
@@ -113,7 +198,8 @@ class CheckpointManager:
         batch_id: str, 
         persisted_count: int, 
         metadata: Optional[Dict[str, Any]] = None,
-        verify_db_state: bool = False
+        verify_db_state: bool = False,
+        durable: bool = False
     ) -> Checkpoint:
         """
         Update checkpoint after successful batch persistence.
@@ -123,6 +209,8 @@ class CheckpointManager:
             persisted_count: Number of documents persisted in this batch
             metadata: Optional metadata to store
             verify_db_state: Whether to verify against actual DB state
+            durable: fsync the checkpoint file and its directory (use for the
+                final checkpoint of a run; per-batch updates skip the fsync)
             
         Returns:
             Updated Checkpoint object
@@ -134,18 +222,26 @@ class CheckpointManager:
         if persisted_count < 0:
             raise ValueError("persisted_count must be non-negative")
         
-        # Calculate cumulative count
-        cumulative_count = persisted_count
-        if self._checkpoints:
-            cumulative_count += self._checkpoints[-1].total_persisted
-        elif self.db:
-            # Try to get count from latest checkpoint in DB
-            latest = self.db.get_latest_checkpoint()
-            if latest:
-                prev_count = latest.get("total_persisted", 0)
-                # Handle case where prev_count is not an int (e.g., Mock in tests)
-                if isinstance(prev_count, int):
-                    cumulative_count += prev_count
+        saved = False
+        if self.db and hasattr(self.db, 'save_checkpoint_incremental'):
+            # One atomic statement derives the new total from the latest row
+            cumulative_count = self._save_to_db(
+                self.db.save_checkpoint_incremental, batch_id, persisted_count, "committed"
+            )
+            saved = True
+        else:
+            # Calculate cumulative count
+            cumulative_count = persisted_count
+            if self._checkpoints:
+                cumulative_count += self._checkpoints[-1].total_persisted
+            elif self.db:
+                # Try to get count from latest checkpoint in DB
+                latest = self.db.get_latest_checkpoint()
+                if latest:
+                    prev_count = latest.get("total_persisted", 0)
+                    # Handle case where prev_count is not an int (e.g., Mock in tests)
+                    if isinstance(prev_count, int):
+                        cumulative_count += prev_count
         
         # Verify against DB state if requested
         db_count_matches = False
@@ -162,21 +258,34 @@ class CheckpointManager:
         
         self._checkpoints.append(checkpoint)
         
-        # Persist to database if available
-        if self.db:
-            try:
-                self.db.save_checkpoint(checkpoint.to_dict())
-            except Exception as e:
-                if "concurrent" in str(e).lower() or "conflict" in str(e).lower():
-                    raise ConflictError("Concurrent update detected") from e
-                raise
+        if self.db and not saved:
+            self._save_to_db(self.db.save_checkpoint, checkpoint.to_dict())
         
         # Persist to file if path provided
         if self.checkpoint_file:
-            self._write_checkpoint_file(checkpoint)
+            self._write_checkpoint_file(checkpoint, durable=durable)
         
         return checkpoint
     
+    def _save_to_db(self, save, *args):
+        """
+        Run a checkpoint save and commit it.
+        
+        The commit here is the single durability boundary for the batch's
+        documents and its checkpoint.
+        
+        Raises:
+            ConflictError: If concurrent update conflict detected
+        """
+        try:
+            result = save(*args)
+            self.db.commit()
+            return result
+        except Exception as e:
+            if "concurrent" in str(e).lower() or "conflict" in str(e).lower():
+                raise ConflictError("Concurrent update detected") from e
+            raise
+    
     def get_recovery_point(self) -> RecoveryPoint:
         """
         Get the current recovery point.
@@ -196,6 +305,12 @@ class CheckpointManager:
         if latest is None and self._checkpoints:
             latest = self._checkpoints[-1].to_dict()
         
+        # Fall back to the checkpoint file (e.g. after a restart without a DB)
+        if latest is None and self.checkpoint_file:
+            checkpoint = self.load_checkpoint_file()
+            if checkpoint is not None:
+                latest = checkpoint.to_dict()
+        
         if latest is None:
             return RecoveryPoint(
                 last_batch_id=None,
@@ -234,15 +349,21 @@ class CheckpointManager:
         if not self.db:
             return ConsistencyReport(consistent=True, discrepancies=[])
         
-        # Get latest checkpoint from DB
-        cp_data = self.db.get_latest_checkpoint()
-        
-        if not cp_data:
-            return ConsistencyReport(consistent=True, discrepancies=[])
-        
-        # Compare with actual DB count
-        actual_count = self.db.get_document_count()
-        expected_count = cp_data.get("total_persisted", 0)
+        if hasattr(self.db, 'get_consistency_snapshot'):
+            # Document count and latest checkpoint total in one round-trip
+            actual_count, expected_count = self.db.get_consistency_snapshot()
+            if expected_count is None:
+                return ConsistencyReport(consistent=True, discrepancies=[])
+        else:
+            # Get latest checkpoint from DB
+            cp_data = self.db.get_latest_checkpoint()
+            
+            if not cp_data:
+                return ConsistencyReport(consistent=True, discrepancies=[])
+            
+            # Compare with actual DB count
+            actual_count = self.db.get_document_count()
+            expected_count = cp_data.get("total_persisted", 0)
         
         if actual_count == expected_count:
             return ConsistencyReport(consistent=True, discrepancies=[])
@@ -257,19 +378,55 @@ class CheckpointManager:
                 discrepancies=[message]
             )
     
-    def _write_checkpoint_file(self, checkpoint: Checkpoint):
-        """Write checkpoint to file atomically"""
-        import json
-        import os
-        import tempfile
+    def load_checkpoint_file(self) -> Optional[Checkpoint]:
+        """
+        Read the checkpoint file, if one exists.
         
+        Files written by older versions in JSON are still accepted.
+        
+        Returns:
+            Checkpoint from the file, or None if there is no file
+            
+        Raises:
+            CorruptCheckpointError: If the file cannot be decoded
+        """
+        if not self.checkpoint_file or not os.path.exists(self.checkpoint_file):
+            return None
+        
+        with open(self.checkpoint_file, 'rb') as f:
+            data = f.read()
+        
+        if data.startswith(b'{'):
+            try:
+                return Checkpoint.from_dict(json.loads(data))
+            except (ValueError, KeyError) as e:
+                raise CorruptCheckpointError(f"Invalid JSON checkpoint file: {e}") from e
+        try:
+            return Checkpoint.from_bytes(data)
+        except UnicodeDecodeError as e:
+            raise CorruptCheckpointError(f"Invalid checkpoint record: {e}") from e
+    
+    def _write_checkpoint_file(self, checkpoint: Checkpoint, *, durable: bool = False):
+        """Write checkpoint to file atomically, fsyncing only when durable"""
         if not self.checkpoint_file:
             return
         
         # Write to temp file first for atomicity
         temp_path = self.checkpoint_file + ".tmp"
-        with open(temp_path, 'w') as f:
-            json.dump(checkpoint.to_dict(), f, indent=2)
+        with open(temp_path, 'wb') as f:
+            f.write(checkpoint.to_bytes())
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        
+        # Atomic rename (os.replace also overwrites on Windows)
+        os.replace(temp_path, self.checkpoint_file)
         
-        # Atomic rename
-        os.rename(temp_path, self.checkpoint_file)
+        # Persist the rename itself; directories cannot be opened for fsync
+        # where os.O_DIRECTORY is missing (Windows)
+        if durable and hasattr(os, 'O_DIRECTORY'):
+            dir_fd = os.open(os.path.dirname(self.checkpoint_file) or '.', os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
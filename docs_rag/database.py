@@ -4,7 +4,90 @@ Provides interface expected by CheckpointManager, StreamingBatchWriter, and Cras
 """
 import sqlite3
 import json
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+
+from docs_rag.batch_ids import parse_batch_num
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+if orjson is not None:
+    def _dumps(value: Any) -> str:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    _loads = orjson.loads
+else:
+    def _dumps(value: Any) -> str:
+        return json.dumps(value, separators=(',', ':'))
+    
+    _loads = json.loads
+
+
+# Hot-path statements, shared as constants so every call hits the same
+# entry in the connection's prepared-statement cache
+_SQL_INSERT_DOCUMENTS = '''
+    INSERT INTO documents (id, content, batch_id, headers, title, sections, metadata, batch_num)
+    VALUES '''
+_DOCUMENT_PLACEHOLDERS = '(?, ?, ?, ?, ?, ?, ?, ?)'
+_DOCUMENT_COLUMNS = 8
+
+_SQL_LATEST_CHECKPOINT = '''
+    SELECT last_batch_id, total_persisted, status, timestamp
+    FROM checkpoints
+    ORDER BY id DESC
+    LIMIT 1
+'''
+
+_SQL_SAVE_CHECKPOINT = '''
+    INSERT INTO checkpoints (last_batch_id, total_persisted, status)
+    VALUES (?, ?, ?)
+'''
+
+_SQL_SAVE_CHECKPOINT_INCREMENTAL = '''
+    INSERT INTO checkpoints (last_batch_id, total_persisted, status)
+    VALUES (
+        ?,
+        COALESCE((SELECT total_persisted FROM checkpoints ORDER BY id DESC LIMIT 1), 0) + ?,
+        ?
+    )
+    RETURNING total_persisted
+'''
+
+_SQL_CONSISTENCY_SNAPSHOT = '''
+    SELECT
+        (SELECT COUNT(*) FROM documents),
+        (SELECT total_persisted FROM checkpoints ORDER BY id DESC LIMIT 1)
+'''
+
+# Documents beyond the latest checkpoint: batches numbered past it, or
+# batches in an unknown format that were never checkpointed. Rows written
+# without batch_num (e.g. by raw SQL) are parsed in SQL.
+# Params: (last_batch_num, last_batch_num)
+_PARTIAL_BATCH_WHERE = (
+    'batch_num > ? OR (batch_num IS NULL AND coalesce('
+    'parse_batch_num(batch_id) > ?, '
+    'NOT EXISTS (SELECT 1 FROM checkpoints WHERE last_batch_id = documents.batch_id)))'
+)
+_SQL_HAS_PARTIAL_BATCH = f'SELECT EXISTS(SELECT 1 FROM documents WHERE {_PARTIAL_BATCH_WHERE})'
+_SQL_HAS_DOCUMENTS = 'SELECT EXISTS(SELECT 1 FROM documents)'
+_SQL_DISCARD_PARTIAL_BATCH = f'DELETE FROM documents WHERE {_PARTIAL_BATCH_WHERE}'
+
+
+@lru_cache(maxsize=32)
+def _insert_documents_sql(row_count: int) -> str:
+    """Multi-row INSERT for row_count documents; cached per row count."""
+    return _SQL_INSERT_DOCUMENTS + ', '.join([_DOCUMENT_PLACEHOLDERS] * row_count)
+
+
+def _maybe_json(value: Any) -> Optional[str]:
+    """Serialize a field to JSON unless it is already a string or None."""
+    if value is None or isinstance(value, str):
+        return value
+    return _dumps(value)
 
 
 class Database:
@@ -12,17 +95,38 @@ class Database:
     SQLite database wrapper providing interface for docs-rag operations.
     """
     
-    def __init__(self, connection: sqlite3.Connection):
+    def __init__(self, connection: sqlite3.Connection, durable: bool = False):
         """
         Initialize with SQLite connection.
         
+        Write methods do not commit on their own; callers drive transaction
+        boundaries through commit() (once per checkpoint).
+        
         Args:
             connection: SQLite database connection
+            durable: Checkpoint the WAL into the main database file on close
         """
         self.conn = connection
         self.cursor = connection.cursor()
+        self.durable = durable
+        # Rows per multi-row INSERT, bounded by the bound-parameter limit
+        self._insert_chunk = max(
+            1, connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER) // _DOCUMENT_COLUMNS
+        )
+        self.conn.create_function('parse_batch_num', 1, parse_batch_num, deterministic=True)
+        self._apply_pragmas()
         self._ensure_tables()
     
+    def _apply_pragmas(self):
+        """Configure WAL journaling and cache sizing for write-heavy workloads."""
+        self.cursor.execute("PRAGMA journal_mode=WAL")
+        self.cursor.execute("PRAGMA synchronous=NORMAL")
+        self.cursor.execute("PRAGMA temp_store=MEMORY")
+        self.cursor.execute("PRAGMA cache_size=-65536")
+        self.cursor.execute("PRAGMA mmap_size=268435456")
+        # Wait for a concurrent WAL writer instead of failing with SQLITE_BUSY
+        self.cursor.execute("PRAGMA busy_timeout=3000")
+    
     def _ensure_tables(self):
         """Ensure required tables exist."""
         # Documents table with full schema for markdown support
@@ -35,10 +139,18 @@ class Database:
                 title TEXT,
                 sections TEXT,
                 metadata TEXT,
+                batch_num INTEGER,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         ''')
         
+        # Tables created by older versions lack batch_num
+        self.cursor.execute('PRAGMA table_info(documents)')
+        if 'batch_num' not in {row[1] for row in self.cursor.fetchall()}:
+            self.cursor.execute('ALTER TABLE documents ADD COLUMN batch_num INTEGER')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_documents_batch_id ON documents(batch_id)')
+        self.cursor.execute('CREATE INDEX IF NOT EXISTS idx_documents_batch_num ON documents(batch_num)')
+        
         # Checkpoints table
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS checkpoints (
@@ -49,6 +161,10 @@ class Database:
                 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
             )
         ''')
+        # Looked up per unnumbered batch when finding partial batches
+        self.cursor.execute(
+            'CREATE INDEX IF NOT EXISTS idx_checkpoints_last_batch_id ON checkpoints(last_batch_id)'
+        )
         
         # Recovery log table
         self.cursor.execute('''
@@ -83,40 +199,39 @@ class Database:
         Raises:
             sqlite3.IntegrityError: If document ID already exists
         """
+        # Handle fields that may already be JSON strings or Python objects
+        batch_num = parse_batch_num(batch_id)
+        params = []
         for doc in documents:
-            # Handle fields that may already be JSON strings or Python objects
-            headers = doc.get('headers')
-            if headers is not None and not isinstance(headers, str):
-                headers = json.dumps(headers)
-                
-            title = doc.get('title')
-            
-            sections = doc.get('sections')
-            if sections is not None and not isinstance(sections, str):
-                sections = json.dumps(sections)
-                
-            metadata = doc.get('metadata')
-            if metadata is not None and not isinstance(metadata, str):
-                metadata = json.dumps(metadata)
-            
-            self.cursor.execute('''
-                INSERT INTO documents (id, content, batch_id, headers, title, sections, metadata)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (
+            params += (
                 doc['id'],
                 doc['content'],
                 batch_id,
-                headers,
-                title,
-                sections,
-                metadata
-            ))
-        self.conn.commit()
+                _maybe_json(doc.get('headers')),
+                doc.get('title'),
+                _maybe_json(doc.get('sections')),
+                _maybe_json(doc.get('metadata')),
+                batch_num
+            )
+        
+        # One multi-row INSERT per chunk instead of a statement step per row;
+        # left uncommitted so the caller can commit documents and checkpoint
+        # together
+        step = self._insert_chunk * _DOCUMENT_COLUMNS
+        for start in range(0, len(params), step):
+            chunk = params[start:start + step]
+            self.cursor.execute(
+                _insert_documents_sql(len(chunk) // _DOCUMENT_COLUMNS), chunk
+            )
     
     def commit(self):
         """Commit pending transactions."""
         self.conn.commit()
     
+    def rollback(self):
+        """Roll back pending transactions."""
+        self.conn.rollback()
+    
     def get_latest_checkpoint(self) -> Optional[Dict[str, Any]]:
         """
         Get the latest checkpoint from database.
@@ -124,12 +239,7 @@ class Database:
         Returns:
             Checkpoint data as dictionary, or None if no checkpoints exist
         """
-        self.cursor.execute('''
-            SELECT last_batch_id, total_persisted, status, timestamp
-            FROM checkpoints
-            ORDER BY id DESC
-            LIMIT 1
-        ''')
+        self.cursor.execute(_SQL_LATEST_CHECKPOINT)
         row = self.cursor.fetchone()
         
         if row is None:
@@ -149,15 +259,30 @@ class Database:
         Args:
             checkpoint_data: Checkpoint data to save
         """
-        self.cursor.execute('''
-            INSERT INTO checkpoints (last_batch_id, total_persisted, status)
-            VALUES (?, ?, ?)
-        ''', (
+        self.cursor.execute(_SQL_SAVE_CHECKPOINT, (
             checkpoint_data['last_batch_id'],
             checkpoint_data['total_persisted'],
             checkpoint_data['status']
         ))
-        self.conn.commit()
+    
+    def save_checkpoint_incremental(self, batch_id: str, delta: int, status: str) -> int:
+        """
+        Save a checkpoint whose total is the previous total plus delta.
+        
+        The new total is computed and stored by one atomic statement, so no
+        separate read of the previous checkpoint is needed.
+        
+        Args:
+            batch_id: ID of the processed batch
+            delta: Number of documents persisted in this batch
+            status: Checkpoint status
+            
+        Returns:
+            The new cumulative total_persisted
+        """
+        self.cursor.execute(_SQL_SAVE_CHECKPOINT_INCREMENTAL, (batch_id, delta, status))
+        (total,), = self.cursor.fetchall()
+        return total
     
     def get_document_count(self) -> int:
         """
@@ -170,6 +295,21 @@ class Database:
         row = self.cursor.fetchone()
         return row[0] if row else 0
     
+    def _partial_batch_params(self, latest: Dict[str, Any]):
+        """Bind the latest checkpoint into _PARTIAL_BATCH_WHERE."""
+        last_batch_num = parse_batch_num(latest.get('last_batch_id')) or 0
+        return (last_batch_num, last_batch_num)
+    
+    def get_consistency_snapshot(self) -> Tuple[int, Optional[int]]:
+        """
+        Get the document count and latest checkpoint total in one query.
+        
+        Returns:
+            (document count, latest total_persisted or None if no checkpoint)
+        """
+        self.cursor.execute(_SQL_CONSISTENCY_SNAPSHOT)
+        return self.cursor.fetchone()
+    
     def has_partial_batch(self) -> bool:
         """
         Check if there are documents without a committed checkpoint.
@@ -177,87 +317,29 @@ class Database:
         Returns:
             True if partial batch exists
         """
-        # Get all batch_ids from documents
-        self.cursor.execute('SELECT DISTINCT batch_id FROM documents')
-        doc_batches = {row[0] for row in self.cursor.fetchall()}
-        
-        # Get the latest checkpoint
         latest = self.get_latest_checkpoint()
         if not latest:
             # No checkpoint means any document is partial
-            return len(doc_batches) > 0
-        
-        # Parse the latest batch number
-        last_batch_id = latest.get('last_batch_id', '')
-        try:
-            parts = last_batch_id.split('_')
-            if len(parts) == 2 and parts[1].isdigit():
-                last_batch_num = int(parts[1])
-            else:
-                last_batch_num = 0
-        except (ValueError, IndexError):
-            last_batch_num = 0
-        
-        # Check if any document batch is beyond the committed checkpoint
-        for batch_id in doc_batches:
-            try:
-                # Handle partial batch names like "batch_006_partial"
-                base_id = batch_id.split('_partial')[0]
-                parts = base_id.split('_')
-                if len(parts) == 2 and parts[1].isdigit():
-                    batch_num = int(parts[1])
-                    if batch_num > last_batch_num:
-                        return True
-            except (ValueError, IndexError):
-                # Unknown batch format, treat as partial
-                if batch_id != last_batch_id:
-                    return True
-        
-        return False
+            self.cursor.execute(_SQL_HAS_DOCUMENTS)
+        else:
+            # EXISTS stops at the first row found by the batch_num index probe
+            self.cursor.execute(_SQL_HAS_PARTIAL_BATCH, self._partial_batch_params(latest))
+        return bool(self.cursor.fetchone()[0])
     
-    def discard_partial_batch(self):
-        """Remove documents from partial batches."""
-        # Get the latest checkpoint
+    def discard_partial_batch(self) -> int:
+        """
+        Remove documents from partial batches.
+        
+        Returns:
+            Number of documents removed (0 means there was no partial batch)
+        """
         latest = self.get_latest_checkpoint()
         if not latest:
             # No checkpoint, delete all documents
             self.cursor.execute('DELETE FROM documents')
-            self.conn.commit()
-            return
-        
-        # Parse the latest batch number
-        last_batch_id = latest.get('last_batch_id', '')
-        try:
-            parts = last_batch_id.split('_')
-            if len(parts) == 2 and parts[1].isdigit():
-                last_batch_num = int(parts[1])
-            else:
-                last_batch_num = 0
-        except (ValueError, IndexError):
-            last_batch_num = 0
-        
-        # Get all batch_ids from documents
-        self.cursor.execute('SELECT DISTINCT batch_id FROM documents')
-        doc_batches = {row[0] for row in self.cursor.fetchall()}
-        
-        # Delete documents from partial batches (batches beyond the checkpoint)
-        for batch_id in doc_batches:
-            try:
-                # Handle partial batch names
-                base_id = batch_id.split('_partial')[0]
-                parts = base_id.split('_')
-                if len(parts) == 2 and parts[1].isdigit():
-                    batch_num = int(parts[1])
-                    if batch_num > last_batch_num:
-                        self.cursor.execute('DELETE FROM documents WHERE batch_id = ?', (batch_id,))
-                elif batch_id != last_batch_id:
-                    # Unknown format, treat as partial
-                    self.cursor.execute('DELETE FROM documents WHERE batch_id = ?', (batch_id,))
-            except (ValueError, IndexError):
-                if batch_id != last_batch_id:
-                    self.cursor.execute('DELETE FROM documents WHERE batch_id = ?', (batch_id,))
-        
-        self.conn.commit()
+        else:
+            self.cursor.execute(_SQL_DISCARD_PARTIAL_BATCH, self._partial_batch_params(latest))
+        return self.cursor.rowcount
     
     def get_documents_by_batch(self, batch_id: str) -> List[Dict[str, Any]]:
         """
@@ -269,27 +351,46 @@ class Database:
         Returns:
             List of documents
         """
-        self.cursor.execute('''
+        return list(self.iter_documents_by_batch(batch_id))
+    
+    def iter_documents_by_batch(
+        self,
+        batch_id: str,
+        chunk_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream documents by batch ID without materializing the whole batch.
+        
+        Args:
+            batch_id: Batch identifier
+            chunk_size: Rows fetched from SQLite per round-trip
+            
+        Yields:
+            Documents in the batch
+        """
+        # Own cursor, so other calls on self.cursor don't reset the stream
+        cursor = self.conn.execute('''
             SELECT id, content, batch_id, headers, metadata
             FROM documents
             WHERE batch_id = ?
         ''', (batch_id,))
+        loads = _loads
         
-        documents = []
-        for row in self.cursor.fetchall():
-            doc = {
-                'id': row[0],
-                'content': row[1],
-                'batch_id': row[2]
-            }
-            if row[3]:
-                doc['headers'] = json.loads(row[3])
-            if row[4]:
-                doc['metadata'] = json.loads(row[4])
-            documents.append(doc)
-        
-        return documents
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for doc_id, content, doc_batch_id, headers, metadata in rows:
+                doc = {'id': doc_id, 'content': content, 'batch_id': doc_batch_id}
+                if headers:
+                    doc['headers'] = loads(headers)
+                if metadata:
+                    doc['metadata'] = loads(metadata)
+                yield doc
     
     def close(self):
         """Close database connection."""
+        if self.durable:
+            self.conn.commit()
+            self.cursor.execute("PRAGMA wal_checkpoint(FULL)")
         self.conn.close()
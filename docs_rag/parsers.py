@@ -2,25 +2,116 @@
 MarkdownHeaderParser - Parse structured markdown with Accept: text/markdown headers
 """
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 import re
 
 
-@dataclass
+# Lines that matter to the parser: a code fence, or an ATX header of 1-6
+# '#' (not followed by another '#') and its text
+_LINE_BODY = r'[^\S\n]*(?:(```)|(#{1,6})(?!#)([^\n]*))'
+_FIRST_LINE_RE = re.compile(_LINE_BODY)
+# Anchoring on a literal newline (rather than ^ in MULTILINE mode) lets the
+# regex engine jump between candidate lines with its fast literal search
+_NEXT_LINE_RE = re.compile(r'\n' + _LINE_BODY)
+# Custom anchor at the end of header text: {#anchor}
+_ANCHOR_RE = re.compile(r'\{#([^}]+)\}\s*$')
+
+
+def _scan_lines(content: str):
+    """Yield fence and header matches in document order."""
+    first = _FIRST_LINE_RE.match(content)
+    if first:
+        yield first
+    yield from _NEXT_LINE_RE.finditer(content, first.end() if first else 0)
+
+
+@dataclass(slots=True, frozen=True)
 class HeaderNode:
     """Represents a parsed markdown header"""
     level: int
     text: str
     anchor: Optional[str] = None
     has_link: bool = False
+
+
+@dataclass(slots=True, frozen=True)
+class ParseResult:
+    """Headers and header metadata from a single scan of a document"""
+    headers: Tuple[HeaderNode, ...]
+    title: Optional[str] = None
+    sections: Tuple[str, ...] = ()
     
-    def __eq__(self, other):
-        if not isinstance(other, HeaderNode):
-            return False
-        return (self.level == other.level and 
-                self.text == other.text and 
-                self.anchor == other.anchor and
-                self.has_link == other.has_link)
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Metadata in the extract_header_metadata() shape"""
+        return {
+            "title": self.title,
+            "sections": list(self.sections)
+        }
+
+
+_EMPTY_RESULT = ParseResult(headers=())
+
+
+@lru_cache(maxsize=128)
+def _parse(content: str) -> ParseResult:
+    """
+    Scan content once for headers, title (first H1) and sections (H2s).
+    
+    Cached for recent documents, so parse_headers() followed by
+    extract_header_metadata() on the same content scans it only once, and
+    documents that recur within the last 128 are not rescanned. Results
+    are immutable, so cached entries cannot be changed by callers.
+    """
+    # Code fences only matter for excluding headers, so content without
+    # any '#' (a single memchr-speed scan) cannot yield one
+    if not content or '#' not in content:
+        return _EMPTY_RESULT
+    
+    headers = []
+    title = None
+    sections = []
+    in_code_block = False
+    
+    # Scan the whole string in C instead of materializing a list of lines
+    for match in _scan_lines(content):
+        fence, hashes, text = match.groups()
+        
+        # Track code blocks
+        if fence:
+            in_code_block = not in_code_block
+            continue
+        
+        # Skip headers inside code blocks
+        if in_code_block:
+            continue
+        
+        # ATX-style header (# Header)
+        level = len(hashes)
+        text = text.strip()
+        
+        # Extract anchor if present {#anchor}; most headers have none, so
+        # a substring test skips the regex call
+        anchor = None
+        if '{#' in text:
+            anchor_match = _ANCHOR_RE.search(text)
+            if anchor_match:
+                anchor = anchor_match.group(1)
+                text = text[:anchor_match.start()].strip()
+        
+        # Check for links
+        has_link = '](' in text and '[' in text
+        
+        # Positional arguments skip keyword matching in the generated __init__
+        headers.append(HeaderNode(level, text, anchor, has_link))
+        
+        if level == 1 and title is None:
+            title = text
+        elif level == 2:
+            sections.append(text)
+    
+    return ParseResult(headers=tuple(headers), title=title, sections=tuple(sections))
 
 
 class MarkdownHeaderParser:
@@ -31,6 +122,7 @@ class MarkdownHeaderParser:
     - Anchor extraction
     - Link detection
     """
+    __slots__ = ("supported_mime_types",)
     
     def __init__(self):
         self.supported_mime_types = ["text/markdown", "text/plain"]
@@ -39,6 +131,18 @@ class MarkdownHeaderParser:
         """Check if content can be parsed as markdown"""
         return isinstance(content, str)
     
+    def parse(self, content: str) -> ParseResult:
+        """
+        Parse headers and header metadata in one pass.
+        
+        Args:
+            content: Markdown content to parse
+            
+        Returns:
+            ParseResult with headers, title and sections
+        """
+        return _parse(content)
+    
     def parse_headers(self, content: str) -> List[HeaderNode]:
         """
         Parse all headers from markdown content.
@@ -49,56 +153,7 @@ class MarkdownHeaderParser:
         Returns:
             List of HeaderNode objects representing headers
         """
-        if not content or not content.strip():
-            return []
-        
-        headers = []
-        in_code_block = False
-        
-        for line in content.split('\n'):
-            # Track code blocks
-            if line.strip().startswith('```'):
-                in_code_block = not in_code_block
-                continue
-            
-            # Skip headers inside code blocks
-            if in_code_block:
-                continue
-            
-            # Parse ATX-style headers (# Header)
-            stripped = line.lstrip()
-            if stripped.startswith('#') and not in_code_block:
-                # Count header level
-                level = 0
-                for char in stripped:
-                    if char == '#':
-                        level += 1
-                    else:
-                        break
-                
-                # Must be H1-H6
-                if 1 <= level <= 6:
-                    # Extract text (remove leading #s and whitespace)
-                    text = stripped[level:].strip()
-                    
-                    # Extract anchor if present {#anchor}
-                    anchor = None
-                    anchor_match = re.search(r'\{#([^}]+)\}\s*$', text)
-                    if anchor_match:
-                        anchor = anchor_match.group(1)
-                        text = text[:anchor_match.start()].strip()
-                    
-                    # Check for links
-                    has_link = '[' in text and '](' in text
-                    
-                    headers.append(HeaderNode(
-                        level=level,
-                        text=text,
-                        anchor=anchor,
-                        has_link=has_link
-                    ))
-        
-        return headers
+        return list(_parse(content).headers)
     
     def extract_header_metadata(self, content: str) -> Dict[str, Any]:
         """
@@ -110,18 +165,4 @@ class MarkdownHeaderParser:
         Returns:
             Dictionary with 'title' and 'sections' keys
         """
-        headers = self.parse_headers(content)
-        
-        title = None
-        sections = []
-        
-        for header in headers:
-            if header.level == 1 and title is None:
-                title = header.text
-            elif header.level == 2:
-                sections.append(header.text)
-        
-        return {
-            "title": title,
-            "sections": sections
-        }
+        return _parse(content).metadata
@@ -4,6 +4,7 @@ CrashRecoveryHandler - Detect incomplete syncs and recover
 from dataclasses import dataclass
 from typing import Optional, List
 
+from docs_rag.batch_ids import parse_committed_batch_num
 from docs_rag.checkpoint import CorruptCheckpointError
 
 
@@ -12,7 +13,7 @@ class DatabaseUnavailableError(Exception):
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class RecoveryResult:
     """Result of recovery operation"""
     success: bool
@@ -24,7 +25,7 @@ class RecoveryResult:
     can_resume: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class IntegrityReport:
     """Report on data integrity after recovery"""
     success: bool
@@ -91,20 +92,14 @@ class CrashRecoveryHandler:
                 )
             
             # Calculate recovered batches
-            batch_count = 0
-            if recovery_point.last_batch_id:
-                try:
-                    parts = recovery_point.last_batch_id.split('_')
-                    if len(parts) == 2 and parts[1].isdigit():
-                        batch_count = int(parts[1])
-                except (ValueError, IndexError):
-                    pass
+            batch_count = parse_committed_batch_num(recovery_point.last_batch_id) or 0
             
             # Check for partial batch
             partial_batch_discarded = False
             if self.db and hasattr(self.db, 'has_partial_batch') and self.db.has_partial_batch():
                 if hasattr(self.db, 'discard_partial_batch'):
                     self.db.discard_partial_batch()
+                    self.db.commit()
                 partial_batch_discarded = True
             
             return RecoveryResult(
@@ -1,9 +1,19 @@
 """
 StreamingBatchWriter - Per-batch persistence to PostgreSQL
 """
+import queue
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+
+
+# Recent batch IDs kept for duplicate detection; older IDs are forgotten so a
+# long-running writer stays O(batch_size) in memory
+_MAX_TRACKED_BATCH_IDS = 10000
+
+# Marks the end of the producer's batches in process_batches
+_DONE = object()
 
 
 class BatchNotFoundError(Exception):
@@ -11,7 +21,7 @@ class BatchNotFoundError(Exception):
     pass
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class BatchResult:
     """Result of batch processing operation"""
     success: bool
@@ -29,6 +39,11 @@ class StreamingBatchWriter:
     - Checkpoint integration
     """
     
+    __slots__ = (
+        "db", "checkpoint_manager", "batch_size",
+        "_pending_batches", "_processed_batch_ids"
+    )
+    
     def __init__(self, db_connection=None, checkpoint_manager=None, batch_size: int = 100):
         """
         Initialize the StreamingBatchWriter.
@@ -42,7 +57,7 @@ class StreamingBatchWriter:
         self.checkpoint_manager = checkpoint_manager
         self.batch_size = batch_size
         self._pending_batches: Dict[str, Any] = {}
-        self._processed_batch_ids: set = set()
+        self._processed_batch_ids: OrderedDict = OrderedDict()
     
     def process_batch(self, documents: List[Dict[str, Any]], batch_id: str) -> BatchResult:
         """
@@ -66,11 +81,12 @@ class StreamingBatchWriter:
         if batch_id in self._processed_batch_ids:
             raise ValueError("Batch ID already exists")
         
-        # Validate each document has required fields
+        # Validate each document has required fields (missing or None);
+        # one lookup per field instead of a membership test plus an index
         for doc in documents:
-            if "id" not in doc or doc["id"] is None:
+            if doc.get("id") is None:
                 raise ValueError("Document missing required field: id")
-            if "content" not in doc or doc["content"] is None:
+            if doc.get("content") is None:
                 raise ValueError("Document missing required field: content")
         
         try:
@@ -78,7 +94,8 @@ class StreamingBatchWriter:
             if self.db:
                 self.db.insert_documents(documents, batch_id)
             
-            # Update checkpoint
+            # Update checkpoint (commits documents and checkpoint together
+            # when the manager shares the connection)
             checkpoint_updated = False
             if self.checkpoint_manager:
                 self.checkpoint_manager.update_checkpoint(
@@ -87,8 +104,15 @@ class StreamingBatchWriter:
                 )
                 checkpoint_updated = True
             
+            # The manager's commit only covers the documents when it writes
+            # through this same connection
+            if self.db and getattr(self.checkpoint_manager, 'db', None) is not self.db:
+                self.db.commit()
+            
             # Track as processed
-            self._processed_batch_ids.add(batch_id)
+            self._processed_batch_ids[batch_id] = None
+            if len(self._processed_batch_ids) > _MAX_TRACKED_BATCH_IDS:
+                self._processed_batch_ids.popitem(last=False)
             
             return BatchResult(
                 success=True,
@@ -98,7 +122,9 @@ class StreamingBatchWriter:
             )
             
         except Exception as e:
-            # Don't update checkpoint on failure
+            # Don't update checkpoint on failure; drop the partial batch
+            if self.db and hasattr(self.db, 'rollback'):
+                self.db.rollback()
             return BatchResult(
                 success=False,
                 persisted_count=0,
@@ -106,15 +132,83 @@ class StreamingBatchWriter:
                 checkpoint_updated=False,
                 error=str(e)
             )
+    
+    def process_batches(
+        self,
+        batches: Iterable[Tuple[str, List[Dict[str, Any]]]],
+        prefetch: int = 4
+    ) -> List[BatchResult]:
+        """
+        Process a stream of batches, preparing upcoming batches while the
+        current one is written.
+        
+        The batches iterable is consumed on a background thread, at most
+        prefetch batches ahead. Batches are persisted in order on the
+        calling thread, which owns the database connection. Processing
+        stops at the first failed batch so the checkpoint never skips one.
+        
+        Args:
+            batches: Iterable of (batch_id, documents) pairs
+            prefetch: Maximum number of prepared batches waiting to be written
+            
+        Returns:
+            BatchResult for each processed batch, ending at the first failure
+            
+        Raises:
+            ValueError: If prefetch is less than 1, or a batch fails
+                validation (see process_batch)
+            Exception: Any error raised while producing batches
+        """
+        # Queue(maxsize=0) would be unbounded, not "no prefetch"
+        if prefetch < 1:
+            raise ValueError("prefetch must be at least 1")
+        
+        pending = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce_batches, args=(batches, pending, stop), daemon=True
+        )
+        producer.start()
+        
+        results = []
+        try:
+            while True:
+                item = pending.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                batch_id, documents = item
+                result = self.process_batch(documents, batch_id)
+                results.append(result)
+                if not result.success:
+                    break
+        finally:
+            stop.set()
+            producer.join()
+        
+        return results
+    
+    @staticmethod
+    def _produce_batches(batches, pending: queue.Queue, stop: threading.Event):
+        """Feed batches (then _DONE, or the raised error) into pending until stopped."""
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    pending.put(item, timeout=0.05)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        try:
+            for batch in batches:
+                if not put(batch):
+                    return
         except Exception as e:
-            # Don't update checkpoint on failure
-            return BatchResult(
-                success=False,
-                persisted_count=0,
-                batch_id=batch_id,
-                checkpoint_updated=False,
-                error=str(e)
-            )
+            put(e)
+            return
+        put(_DONE)
     
     def commit_batch(self, batch_id: str) -> bool:
         """
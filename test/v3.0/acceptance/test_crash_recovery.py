@@ -4,10 +4,8 @@ SDD Level: End-to-End Acceptance Tests
 Implements E2E-002: Recover from crash during batch 5
 """
 import pytest
-import tempfile
 import sqlite3
 import time
-import os
 
 
 class TestCrashRecoveryAcceptance:
@@ -37,40 +35,39 @@ class TestCrashRecoveryAcceptance:
     """
     
     @pytest.fixture
-    def e2e_environment(self):
+    def e2e_environment(self, tmp_path):
         """Create full E2E test environment"""
         from docs_rag.streaming import StreamingBatchWriter
         from docs_rag.checkpoint import CheckpointManager
         from docs_rag.recovery import CrashRecoveryHandler
         from docs_rag.database import Database
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            db_path = os.path.join(tmpdir, "docs_rag_e2e.db")
-            conn = sqlite3.connect(db_path)
-            db = Database(conn)
-            cursor = conn.cursor()
-            
-            checkpoint_manager = CheckpointManager(db_connection=db)
-            batch_writer = StreamingBatchWriter(
-                db_connection=db,
-                checkpoint_manager=checkpoint_manager
-            )
-            recovery_handler = CrashRecoveryHandler(
-                checkpoint_manager=checkpoint_manager,
-                db_connection=db
-            )
-            
-            yield {
-                "db": conn,
-                "db_wrapper": db,
-                "cursor": cursor,
-                "batch_writer": batch_writer,
-                "checkpoint_manager": checkpoint_manager,
-                "recovery_handler": recovery_handler,
-                "db_path": db_path
-            }
-            
-            conn.close()
+        db_path = str(tmp_path / "docs_rag_e2e.db")
+        conn = sqlite3.connect(db_path)
+        db = Database(conn)
+        cursor = conn.cursor()
+        
+        checkpoint_manager = CheckpointManager(db_connection=db)
+        batch_writer = StreamingBatchWriter(
+            db_connection=db,
+            checkpoint_manager=checkpoint_manager
+        )
+        recovery_handler = CrashRecoveryHandler(
+            checkpoint_manager=checkpoint_manager,
+            db_connection=db
+        )
+        
+        yield {
+            "db": conn,
+            "db_wrapper": db,
+            "cursor": cursor,
+            "batch_writer": batch_writer,
+            "checkpoint_manager": checkpoint_manager,
+            "recovery_handler": recovery_handler,
+            "db_path": db_path
+        }
+        
+        conn.close()
     
     def test_e2e_crash_recovery_batch_5(self, e2e_environment):
         """
@@ -107,15 +104,17 @@ class TestCrashRecoveryAcceptance:
         # Phase 2: Simulate crash during batch 5
         # ========================================
         # Insert some documents from batch 5 (simulating partial write)
-        for doc_num in range(30):  # Only 30 of 100 written
-            cursor.execute('''
-                INSERT INTO documents (id, content, batch_id)
-                VALUES (?, ?, ?)
-            ''', (
+        cursor.executemany('''
+            INSERT INTO documents (id, content, batch_id)
+            VALUES (?, ?, ?)
+        ''', (
+            (
                 f"batch005_doc{doc_num:04d}",
                 f"Partial content {doc_num}",
                 "batch_005_partial"
-            ))
+            )
+            for doc_num in range(30)  # Only 30 of 100 written
+        ))
         db.commit()
         
         # Note: Checkpoint still shows batch_004 (simulating crash before checkpoint update)
@@ -137,16 +136,16 @@ class TestCrashRecoveryAcceptance:
         # ========================================
         # Phase 4: Verify data integrity
         # ========================================
-        # Verify batches 1-4 intact (400 docs)
-        cursor.execute("SELECT COUNT(*) FROM documents WHERE batch_id IN (?, ?, ?, ?)",
-                      ("batch_001", "batch_002", "batch_003", "batch_004"))
-        committed_count = cursor.fetchone()[0]
+        # Verify batches 1-4 intact (400 docs) and partial batch discarded
+        cursor.execute('''
+            SELECT
+                COUNT(*) FILTER (WHERE batch_id IN (?, ?, ?, ?)),
+                COUNT(*) FILTER (WHERE batch_id = ?)
+            FROM documents
+        ''', ("batch_001", "batch_002", "batch_003", "batch_004", "batch_005_partial"))
+        committed_count, partial_count = cursor.fetchone()
         assert committed_count == 400, f"Expected 400 committed docs, found {committed_count}"
-        
-        # Verify partial batch discarded
-        cursor.execute("SELECT COUNT(*) FROM documents WHERE batch_id = ?",
-                      ("batch_005_partial",))
-        assert cursor.fetchone()[0] == 0, "Partial batch should be discarded"
+        assert partial_count == 0, "Partial batch should be discarded"
         
         # ========================================
         # Phase 5: Complete processing batches 5-10
@@ -166,19 +165,11 @@ class TestCrashRecoveryAcceptance:
         # ========================================
         # Phase 6: Final verification
         # ========================================
-        cursor.execute("SELECT COUNT(*) FROM documents")
-        total_docs = cursor.fetchone()[0]
+        # Verify total count and no duplicates
+        cursor.execute("SELECT COUNT(*), COUNT(*) - COUNT(DISTINCT id) FROM documents")
+        total_docs, duplicates = cursor.fetchone()
         assert total_docs == 1000, f"Expected 1000 total docs, found {total_docs}"
-        
-        # Verify no duplicates
-        cursor.execute('''
-            SELECT id, COUNT(*) as cnt 
-            FROM documents 
-            GROUP BY id 
-            HAVING cnt > 1
-        ''')
-        duplicates = cursor.fetchall()
-        assert len(duplicates) == 0, f"Found duplicates: {duplicates}"
+        assert duplicates == 0, f"Found {duplicates} duplicate document IDs"
         
         # Verify integrity report
         integrity_report = recovery_handler.validate_integrity()
@@ -209,12 +200,14 @@ class TestCrashRecoveryAcceptance:
         recovery_handler = e2e_environment["recovery_handler"]
         cursor = e2e_environment["cursor"]
         
-        # Setup 10k documents
-        for i in range(100):
-            for j in range(100):
-                cursor.execute('''
-                    INSERT INTO documents (id, content, batch_id) VALUES (?, ?, ?)
-                ''', (f"doc_{i}_{j}", "content", f"batch_{i:03d}"))
+        # Setup 10k documents, streamed into a single prepared statement
+        cursor.executemany('''
+            INSERT INTO documents (id, content, batch_id) VALUES (?, ?, ?)
+        ''', (
+            (f"doc_{i}_{j}", "content", f"batch_{i:03d}")
+            for i in range(100)
+            for j in range(100)
+        ))
         
         cursor.execute('''
             INSERT INTO checkpoints (last_batch_id, total_persisted, status)
@@ -237,33 +230,34 @@ class TestDataIntegrityGuarantees:
     """
     
     @pytest.fixture
-    def integrity_env(self):
+    def integrity_env(self, tmp_path):
         """Create environment for integrity tests"""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            db_path = os.path.join(tmpdir, "integrity.db")
-            conn = sqlite3.connect(db_path)
-            
-            from docs_rag.streaming import StreamingBatchWriter
-            from docs_rag.checkpoint import CheckpointManager
-            from docs_rag.recovery import CrashRecoveryHandler
-            
-            checkpoint_manager = CheckpointManager(db_connection=conn)
-            batch_writer = StreamingBatchWriter(
-                db_connection=conn,
-                checkpoint_manager=checkpoint_manager
-            )
-            recovery_handler = CrashRecoveryHandler(
-                checkpoint_manager=checkpoint_manager,
-                db_connection=conn
-            )
-            
-            yield {
-                "db": conn,
-                "batch_writer": batch_writer,
-                "recovery_handler": recovery_handler
-            }
-            
-            conn.close()
+        db_path = str(tmp_path / "integrity.db")
+        conn = sqlite3.connect(db_path)
+        
+        from docs_rag.streaming import StreamingBatchWriter
+        from docs_rag.checkpoint import CheckpointManager
+        from docs_rag.recovery import CrashRecoveryHandler
+        from docs_rag.database import Database
+        
+        db = Database(conn)
+        checkpoint_manager = CheckpointManager(db_connection=db)
+        batch_writer = StreamingBatchWriter(
+            db_connection=db,
+            checkpoint_manager=checkpoint_manager
+        )
+        recovery_handler = CrashRecoveryHandler(
+            checkpoint_manager=checkpoint_manager,
+            db_connection=db
+        )
+        
+        yield {
+            "db": conn,
+            "batch_writer": batch_writer,
+            "recovery_handler": recovery_handler
+        }
+        
+        conn.close()
     
     def test_atomicity_batch_all_or_nothing(self, integrity_env):
         """
@@ -4,11 +4,21 @@ SDD Level: End-to-End Acceptance Tests
 Implements E2E-001: Process large document set with streaming
 """
 import pytest
-import tempfile
 import sqlite3
 import time
 import os
 import psutil
+from itertools import islice
+
+
+def rss_mb():
+    """Resident set size in MB, read straight from /proc where available"""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, AttributeError, ValueError):
+        return psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
 
 
 class TestLargeDatasetStreaming:
@@ -36,45 +46,47 @@ class TestLargeDatasetStreaming:
     """
     
     @pytest.fixture
-    def large_dataset_env(self):
+    def large_dataset_env(self, tmp_path):
         """Create environment for large dataset test"""
         from docs_rag.streaming import StreamingBatchWriter
         from docs_rag.checkpoint import CheckpointManager
         from docs_rag.database import Database
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            db_path = os.path.join(tmpdir, "large_dataset.db")
-            conn = sqlite3.connect(db_path)
-            db = Database(conn)
-            cursor = conn.cursor()
-            
-            checkpoint_manager = CheckpointManager(db_connection=db)
-            batch_writer = StreamingBatchWriter(
-                db_connection=db,
-                checkpoint_manager=checkpoint_manager,
-                batch_size=100
-            )
-            
-            # Generate 1000 documents
-            documents = [
-                {
+        db_path = tmp_path / "large_dataset.db"
+        conn = sqlite3.connect(db_path)
+        # Only this connection ever opens the file; set before Database
+        # enables WAL so the WAL index lives in heap memory, not a -shm file
+        conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+        db = Database(conn)
+        cursor = conn.cursor()
+        
+        checkpoint_manager = CheckpointManager(db_connection=db)
+        batch_writer = StreamingBatchWriter(
+            db_connection=db,
+            checkpoint_manager=checkpoint_manager,
+            batch_size=100
+        )
+        
+        # Generate 1000 documents lazily; tests pull one batch at a time
+        def generate_documents():
+            for i in range(1000):
+                yield {
                     "id": f"doc_{i:05d}",
                     "content": f"This is document number {i} with sufficient content to simulate real documents. " * 10,
                     "metadata": {"index": i, "category": f"cat_{i % 10}"}
                 }
-                for i in range(1000)
-            ]
-            
-            yield {
-                "db": conn,
-                "db_wrapper": db,
-                "cursor": cursor,
-                "batch_writer": batch_writer,
-                "checkpoint_manager": checkpoint_manager,
-                "documents": documents
-            }
-            
-            conn.close()
+        documents = generate_documents()
+        
+        yield {
+            "db": conn,
+            "db_wrapper": db,
+            "cursor": cursor,
+            "batch_writer": batch_writer,
+            "checkpoint_manager": checkpoint_manager,
+            "documents": documents
+        }
+        
+        conn.close()
     
     def test_e2e_large_dataset_processing(self, large_dataset_env):
         """
@@ -91,8 +103,7 @@ class TestLargeDatasetStreaming:
         # ========================================
         # Measure initial memory
         # ========================================
-        process = psutil.Process(os.getpid())
-        initial_memory = process.memory_info().rss / 1024 / 1024  # MB
+        initial_memory = rss_mb()
         
         # ========================================
         # Process all batches with timing
@@ -100,9 +111,7 @@ class TestLargeDatasetStreaming:
         start_time = time.time()
         
         for batch_num in range(total_batches):
-            start_idx = batch_num * batch_size
-            end_idx = start_idx + batch_size
-            batch_docs = documents[start_idx:end_idx]
+            batch_docs = list(islice(documents, batch_size))
             
             result = batch_writer.process_batch(batch_docs, f"batch_{batch_num:03d}")
             
@@ -114,7 +123,7 @@ class TestLargeDatasetStreaming:
         # ========================================
         # Measure peak memory
         # ========================================
-        peak_memory = process.memory_info().rss / 1024 / 1024  # MB
+        peak_memory = rss_mb()
         memory_increase = peak_memory - initial_memory
         
         # ========================================
@@ -144,20 +153,15 @@ class TestLargeDatasetStreaming:
         batch_writer = large_dataset_env["batch_writer"]
         documents = large_dataset_env["documents"]
         
-        process = psutil.Process(os.getpid())
         memory_samples = []
         
         for batch_num in range(10):
-            # Measure memory before batch
-            mem_before = process.memory_info().rss / 1024 / 1024
-            
             # Process batch
-            start_idx = batch_num * 100
-            batch_docs = documents[start_idx:start_idx + 100]
+            batch_docs = list(islice(documents, 100))
             batch_writer.process_batch(batch_docs, f"batch_{batch_num:03d}")
             
             # Measure memory after batch
-            mem_after = process.memory_info().rss / 1024 / 1024
+            mem_after = rss_mb()
             memory_samples.append(mem_after)
         
         # Verify memory doesn't trend upward significantly
@@ -181,8 +185,7 @@ class TestLargeDatasetStreaming:
         
         # Process first 3 batches successfully
         for batch_num in range(3):
-            start_idx = batch_num * 100
-            batch_docs = documents[start_idx:start_idx + 100]
+            batch_docs = list(islice(documents, 100))
             result = batch_writer.process_batch(batch_docs, f"batch_{batch_num:03d}")
             assert result.success is True
         
@@ -197,8 +200,7 @@ class TestLargeDatasetStreaming:
         
         # Continue processing from batch_003
         for batch_num in range(3, 10):
-            start_idx = batch_num * 100
-            batch_docs = documents[start_idx:start_idx + 100]
+            batch_docs = list(islice(documents, 100))
             result = batch_writer.process_batch(batch_docs, f"batch_{batch_num:03d}")
             assert result.success is True
         
@@ -216,8 +218,7 @@ class TestLargeDatasetStreaming:
         checkpoint_manager = large_dataset_env["checkpoint_manager"]
         
         for batch_num in range(5):
-            start_idx = batch_num * 100
-            batch_docs = documents[start_idx:start_idx + 100]
+            batch_docs = list(islice(documents, 100))
             batch_writer.process_batch(batch_docs, f"batch_{batch_num:03d}")
             
             # Verify checkpoint updated immediately
@@ -238,8 +239,7 @@ class TestLargeDatasetStreaming:
         
         # Process 5 batches
         for batch_num in range(5):
-            start_idx = batch_num * 100
-            batch_docs = documents[start_idx:start_idx + 100]
+            batch_docs = list(islice(documents, 100))
             batch_writer.process_batch(batch_docs, f"batch_{batch_num:03d}")
         
         # Simulate crash and recovery
@@ -254,8 +254,7 @@ class TestLargeDatasetStreaming:
         
         # Continue processing remaining batches
         for batch_num in range(5, 10):
-            start_idx = batch_num * 100
-            batch_docs = documents[start_idx:start_idx + 100]
+            batch_docs = list(islice(documents, 100))
             result = batch_writer.process_batch(batch_docs, f"batch_{batch_num:03d}")
             assert result.success is True
         
@@ -3,10 +3,20 @@ Acceptance tests for Markdown Header Extraction
 SDD Level: End-to-End Acceptance Tests
 Implements E2E-003: Process markdown with headers
 """
+import json
 import pytest
-import tempfile
 import sqlite3
-import os
+
+from docs_rag.checkpoint import CheckpointManager
+from docs_rag.database import Database
+from docs_rag.parsers import MarkdownHeaderParser
+from docs_rag.streaming import StreamingBatchWriter
+
+
+@pytest.fixture(scope="module")
+def markdown_parser():
+    """Stateless parser shared by every test in this module"""
+    return MarkdownHeaderParser()
 
 
 class TestMarkdownHeaderExtraction:
@@ -28,35 +38,28 @@ class TestMarkdownHeaderExtraction:
     """
     
     @pytest.fixture
-    def markdown_env(self):
+    def markdown_env(self, markdown_parser):
         """Create environment for markdown tests"""
-        from docs_rag.parsers import MarkdownHeaderParser
-        from docs_rag.streaming import StreamingBatchWriter
-        from docs_rag.checkpoint import CheckpointManager
-        from docs_rag.database import Database
+        conn = sqlite3.connect(':memory:')
+        db = Database(conn)
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
         
-        with tempfile.TemporaryDirectory() as tmpdir:
-            db_path = os.path.join(tmpdir, "markdown.db")
-            conn = sqlite3.connect(db_path)
-            db = Database(conn)
-            cursor = conn.cursor()
-            
-            parser = MarkdownHeaderParser()
-            checkpoint_manager = CheckpointManager(db_connection=db)
-            batch_writer = StreamingBatchWriter(
-                db_connection=db,
-                checkpoint_manager=checkpoint_manager
-            )
-            
-            yield {
-                "db": conn,
-                "db_wrapper": db,
-                "cursor": cursor,
-                "parser": parser,
-                "batch_writer": batch_writer
-            }
-            
-            conn.close()
+        checkpoint_manager = CheckpointManager(db_connection=db)
+        batch_writer = StreamingBatchWriter(
+            db_connection=db,
+            checkpoint_manager=checkpoint_manager
+        )
+        
+        yield {
+            "db": conn,
+            "db_wrapper": db,
+            "cursor": cursor,
+            "parser": markdown_parser,
+            "batch_writer": batch_writer
+        }
+        
+        conn.close()
     
     def test_e2e_markdown_header_extraction(self, markdown_env):
         """
@@ -109,13 +112,18 @@ Future research directions."""
         # ========================================
         assert len(headers) == 10
         
+        # Group headers by level in one pass
+        by_level = {level: [] for level in range(1, 7)}
+        for h in headers:
+            by_level[h.level].append(h)
+        
         # Verify H1
         assert headers[0].level == 1
         assert headers[0].text == "Main Document Title"
         assert headers[0].anchor == "main-title"
         
         # Verify H2s
-        h2_headers = [h for h in headers if h.level == 2]
+        h2_headers = by_level[2]
         assert len(h2_headers) == 3
         assert h2_headers[0].text == "Introduction"
         assert h2_headers[0].anchor == "intro"
@@ -123,7 +131,7 @@ Future research directions."""
         assert h2_headers[1].anchor == "method"
         
         # Verify H3s
-        h3_headers = [h for h in headers if h.level == 3]
+        h3_headers = by_level[3]
         assert len(h3_headers) == 6
         
         # ========================================
@@ -137,7 +145,6 @@ Future research directions."""
         # ========================================
         # When: Store document with metadata
         # ========================================
-        import json
         document = {
             "id": "doc_markdown_001",
             "content": content,
@@ -150,9 +157,9 @@ Future research directions."""
             "sections": json.dumps(metadata["sections"]),
             "metadata": json.dumps({
                 "header_count": len(headers),
-                "h1_count": len([h for h in headers if h.level == 1]),
-                "h2_count": len([h for h in headers if h.level == 2]),
-                "h3_count": len([h for h in headers if h.level == 3])
+                "h1_count": len(by_level[1]),
+                "h2_count": len(by_level[2]),
+                "h3_count": len(by_level[3])
             })
         }
         
@@ -162,49 +169,17 @@ Future research directions."""
         # ========================================
         # Then: Verify stored document queryable
         # ========================================
-        cursor.execute("SELECT * FROM documents WHERE id = ?", ("doc_markdown_001",))
+        cursor.execute('''
+            SELECT
+                json_array_length(headers) AS header_count,
+                json_extract(headers, '$[0].anchor') AS first_anchor
+            FROM documents WHERE id = ?
+        ''', ("doc_markdown_001",))
         row = cursor.fetchone()
         
         assert row is not None
-        stored_headers = json.loads(row[3])  # headers column
-        assert len(stored_headers) == 10
-        assert stored_headers[0]["anchor"] == "main-title"
-    
-    def test_e2e_markdown_no_headers(self, markdown_env):
-        """
-        Test markdown document without headers
-        """
-        parser = markdown_env["parser"]
-        
-        content = """This is a plain document without any headers.
-
-It has multiple paragraphs but no structured headers.
-
-Just plain text content."""
-        
-        headers = parser.parse_headers(content)
-        metadata = parser.extract_header_metadata(content)
-        
-        assert headers == []
-        assert metadata["title"] is None
-        assert metadata["sections"] == []
-    
-    def test_e2e_markdown_headers_without_anchors(self, markdown_env):
-        """
-        Test markdown with headers that don't have custom anchors
-        """
-        parser = markdown_env["parser"]
-        
-        content = """# Title Without Anchor
-## Section Without Anchor
-### Subsection Without Anchor"""
-        
-        headers = parser.parse_headers(content)
-        
-        assert len(headers) == 3
-        assert headers[0].anchor is None
-        assert headers[1].anchor is None
-        assert headers[2].anchor is None
+        assert row["header_count"] == 10
+        assert row["first_anchor"] == "main-title"
     
     def test_e2e_document_structure_queryable(self, markdown_env):
         """
@@ -213,23 +188,22 @@ Just plain text content."""
         batch_writer = markdown_env["batch_writer"]
         cursor = markdown_env["cursor"]
         
-        import json
-        
-        # Create document with rich structure
+        # Create document with rich structure; the Database serializes
+        # list/dict fields itself
         documents = [
             {
                 "id": "api_guide",
                 "content": "# API Guide\n## Authentication\n## Endpoints",
                 "title": "API Guide",
-                "sections": json.dumps(["Authentication", "Endpoints"]),
-                "metadata": json.dumps({"type": "api", "version": "1.0"})
+                "sections": ["Authentication", "Endpoints"],
+                "metadata": {"type": "api", "version": "1.0"}
             },
             {
                 "id": "user_manual",
                 "content": "# User Manual\n## Getting Started\n## Advanced Features",
                 "title": "User Manual",
-                "sections": json.dumps(["Getting Started", "Advanced Features"]),
-                "metadata": json.dumps({"type": "manual", "version": "2.0"})
+                "sections": ["Getting Started", "Advanced Features"],
+                "metadata": {"type": "manual", "version": "2.0"}
             }
         ]
         
@@ -238,7 +212,7 @@ Just plain text content."""
         
         # Query by title
         cursor.execute("SELECT id FROM documents WHERE title = ?", ("API Guide",))
-        assert cursor.fetchone()[0] == "api_guide"
+        assert cursor.fetchone()["id"] == "api_guide"
         
         # Query documents with specific section
         cursor.execute("SELECT id, sections FROM documents")
@@ -246,40 +220,55 @@ Just plain text content."""
         
         all_sections = []
         for row in rows:
-            sections = json.loads(row[1])  # sections column
+            sections = json.loads(row["sections"])
             all_sections.extend(sections)
         
         assert "Authentication" in all_sections
         assert "Getting Started" in all_sections
     
-    def test_e2e_markdown_special_characters(self, markdown_env):
-        """
-        Test markdown with special characters in headers
-        """
-        parser = markdown_env["parser"]
-        
-        content = """# Header with "quotes"
+    @pytest.mark.parametrize("content,expected_headers,expected_title", [
+        pytest.param(
+            """This is a plain document without any headers.
+
+It has multiple paragraphs but no structured headers.
+
+Just plain text content.""",
+            [],
+            None,
+            id="no_headers"
+        ),
+        pytest.param(
+            """# Title Without Anchor
+## Section Without Anchor
+### Subsection Without Anchor""",
+            [
+                (1, "Title Without Anchor", None),
+                (2, "Section Without Anchor", None),
+                (3, "Subsection Without Anchor", None)
+            ],
+            "Title Without Anchor",
+            id="headers_without_anchors"
+        ),
+        pytest.param(
+            """# Header with "quotes"
 ## Header with 'apostrophes'
 ### Header with &amp; entities
 #### Header with [brackets] and (parentheses)
 ##### Header with *asterisks* and **double**
-###### Header with `code`"""
-        
-        headers = parser.parse_headers(content)
-        
-        assert len(headers) == 6
-        # Verify headers parsed despite special characters
-        assert "quotes" in headers[0].text
-        assert "apostrophes" in headers[1].text
-        assert "code" in headers[5].text
-    
-    def test_e2e_nested_header_structure(self, markdown_env):
-        """
-        Test preservation of header hierarchy
-        """
-        parser = markdown_env["parser"]
-        
-        content = """# Root
+###### Header with `code`""",
+            [
+                (1, 'Header with "quotes"', None),
+                (2, "Header with 'apostrophes'", None),
+                (3, "Header with &amp; entities", None),
+                (4, "Header with [brackets] and (parentheses)", None),
+                (5, "Header with *asterisks* and **double**", None),
+                (6, "Header with `code`", None)
+            ],
+            'Header with "quotes"',
+            id="special_characters"
+        ),
+        pytest.param(
+            """# Root
 ## Level 2 A
 ### Level 3 A1
 ### Level 3 A2
@@ -287,17 +276,31 @@ Just plain text content."""
 ### Level 3 B1
 #### Level 4 B1a
 ##### Level 5 B1a1
-###### Level 6 B1a1i"""
-        
-        headers = parser.parse_headers(content)
+###### Level 6 B1a1i""",
+            [
+                (1, "Root", None),
+                (2, "Level 2 A", None),
+                (3, "Level 3 A1", None),
+                (3, "Level 3 A2", None),
+                (2, "Level 2 B", None),
+                (3, "Level 3 B1", None),
+                (4, "Level 4 B1a", None),
+                (5, "Level 5 B1a1", None),
+                (6, "Level 6 B1a1i", None)
+            ],
+            "Root",
+            id="nested_header_structure"
+        ),
+    ])
+    def test_e2e_parse_headers(self, markdown_parser, content, expected_headers, expected_title):
+        """
+        Test header extraction across document shapes: no headers, no
+        anchors, special characters and a full H1-H6 hierarchy (order
+        preserved)
+        """
+        headers = markdown_parser.parse_headers(content)
+        metadata = markdown_parser.extract_header_metadata(content)
         
-        # Verify order preserved
-        assert headers[0].level == 1
-        assert headers[1].level == 2
-        assert headers[2].level == 3
-        assert headers[3].level == 3
-        assert headers[4].level == 2
-        assert headers[5].level == 3
-        assert headers[6].level == 4
-        assert headers[7].level == 5
-        assert headers[8].level == 6
+        assert [(h.level, h.text, h.anchor) for h in headers] == expected_headers
+        assert metadata["title"] == expected_title
+        assert metadata["sections"] == [text for level, text, _ in expected_headers if level == 2]
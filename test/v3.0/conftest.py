@@ -2,9 +2,7 @@
 Pytest configuration and shared fixtures for docs-rag v3.0 tests
 """
 import pytest
-import tempfile
 import sqlite3
-import os
 
 
 @pytest.fixture
@@ -13,26 +11,22 @@ def temp_database():
     Create a temporary SQLite database for testing.
     Yields connection, cleans up after test.
     """
-    with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
-        db_path = f.name
-    
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(':memory:')
     
     yield conn
     
     conn.close()
-    os.unlink(db_path)
 
 
-@pytest.fixture
-def initialized_database(temp_database):
+@pytest.fixture(scope="session")
+def schema_template():
     """
-    Create a temporary database with full schema initialized.
+    In-memory database holding the full schema, built once per session.
     """
-    cursor = temp_database.cursor()
+    template = sqlite3.connect(':memory:')
     
     # Documents table
-    cursor.execute('''
+    template.execute('''
         CREATE TABLE IF NOT EXISTS documents (
             id TEXT PRIMARY KEY,
             content TEXT NOT NULL,
@@ -42,9 +36,11 @@ def initialized_database(temp_database):
             created_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     ''')
+    # Same name as Database's index so wrapping the connection reuses it
+    template.execute('CREATE INDEX IF NOT EXISTS idx_documents_batch_id ON documents(batch_id)')
     
     # Checkpoints table
-    cursor.execute('''
+    template.execute('''
         CREATE TABLE IF NOT EXISTS checkpoints (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             last_batch_id TEXT NOT NULL,
@@ -55,7 +51,7 @@ def initialized_database(temp_database):
     ''')
     
     # Recovery log table
-    cursor.execute('''
+    template.execute('''
         CREATE TABLE IF NOT EXISTS recovery_log (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             operation TEXT NOT NULL,
@@ -66,7 +62,20 @@ def initialized_database(temp_database):
         )
     ''')
     
-    temp_database.commit()
+    template.commit()
+    
+    yield template
+    
+    template.close()
+
+
+@pytest.fixture
+def initialized_database(temp_database, schema_template):
+    """
+    Create a temporary database with full schema initialized.
+    Copies the session's schema template page-for-page via backup().
+    """
+    schema_template.backup(temp_database)
     
     return temp_database
 
@@ -136,11 +145,12 @@ def mock_checkpoint():
     return _create
 
 
-@pytest.fixture(autouse=True)
+@pytest.fixture
 def clear_import_cache():
     """
-    Clear import cache between tests to ensure fresh imports.
-    This is important for testing the RED-GREEN-REFACTOR cycle.
+    Clear import cache so the test gets fresh docs_rag imports.
+    Opt in with @pytest.mark.usefixtures("clear_import_cache") for
+    RED-GREEN-REFACTOR tests that need modules re-imported.
     """
     # Remove any cached docs_rag modules
     modules_to_remove = [
@@ -153,32 +163,3 @@ def clear_import_cache():
 
 # Import sys for the fixture above
 import sys
-from unittest.mock import Mock
-
-
-@pytest.fixture
-def mock_db():
-    """Mock database connection"""
-    return Mock()
-
-
-@pytest.fixture
-def mock_checkpoint_manager():
-    """Mock checkpoint manager"""
-    cm = Mock()
-    cm.update_checkpoint.return_value = Mock(
-        last_batch_id="batch_001",
-        total_persisted=2,
-        status="committed"
-    )
-    return cm
-
-
-@pytest.fixture
-def batch_writer(mock_db, mock_checkpoint_manager):
-    """Create StreamingBatchWriter instance with mocked dependencies"""
-    from docs_rag.streaming import StreamingBatchWriter
-    return StreamingBatchWriter(
-        db_connection=mock_db,
-        checkpoint_manager=mock_checkpoint_manager
-    )
@@ -4,9 +4,13 @@ SDD Level: Module Collaboration Tests for Crash Recovery
 """
 import pytest
 from unittest.mock import Mock, patch, MagicMock
-import tempfile
 import sqlite3
 
+from docs_rag.checkpoint import CheckpointManager
+from docs_rag.database import Database
+from docs_rag.recovery import CrashRecoveryHandler
+from docs_rag.streaming import StreamingBatchWriter
+
 
 class TestRecoveryFlow:
     """
@@ -17,14 +21,7 @@ class TestRecoveryFlow:
     @pytest.fixture
     def recovery_setup(self):
         """Create full recovery test environment"""
-        from docs_rag.checkpoint import CheckpointManager
-        from docs_rag.recovery import CrashRecoveryHandler
-        from docs_rag.database import Database
-        
-        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
-            db_path = f.name
-        
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(':memory:')
         db = Database(conn)
         cursor = conn.cursor()
         
@@ -43,8 +40,6 @@ class TestRecoveryFlow:
         }
         
         conn.close()
-        import os
-        os.unlink(db_path)
     
     def test_full_recovery_scenario(self, recovery_setup):
         """
@@ -58,31 +53,32 @@ class TestRecoveryFlow:
         db = recovery_setup["db"]
         cursor = recovery_setup["cursor"]
         
-        # Setup: Batches 1-5 committed
-        for batch_num in range(1, 6):
-            for doc_num in range(10):
-                cursor.execute('''
-                    INSERT INTO documents (id, content, batch_id)
-                    VALUES (?, ?, ?)
-                ''', (f"doc_b{batch_num}_d{doc_num}", "content", f"batch_{batch_num:03d}"))
-        
-        # Setup: Checkpoint at batch 5
-        cursor.execute('''
-            INSERT INTO checkpoints (last_batch_id, total_persisted, status)
-            VALUES (?, ?, ?)
-        ''', ("batch_005", 50, "committed"))
-        
-        # Setup: Partial batch 6 (simulating crash during processing)
-        cursor.execute('''
-            INSERT INTO documents (id, content, batch_id)
-            VALUES (?, ?, ?)
-        ''', ("partial_doc_1", "partial", "batch_006_partial"))
-        cursor.execute('''
-            INSERT INTO documents (id, content, batch_id)
-            VALUES (?, ?, ?)
-        ''', ("partial_doc_2", "partial", "batch_006_partial"))
-        
-        db.commit()
+        # Setup runs as one transaction, committed on leaving the block
+        with db:
+            # Setup: Batches 1-5 committed
+            cursor.executemany('''
+                INSERT INTO documents (id, content, batch_id)
+                VALUES (?, ?, ?)
+            ''', [
+                (f"doc_b{batch_num}_d{doc_num}", "content", f"batch_{batch_num:03d}")
+                for batch_num in range(1, 6)
+                for doc_num in range(10)
+            ])
+        
+            # Setup: Checkpoint at batch 5
+            cursor.execute('''
+                INSERT INTO checkpoints (last_batch_id, total_persisted, status)
+                VALUES (?, ?, ?)
+            ''', ("batch_005", 50, "committed"))
+        
+            # Setup: Partial batch 6 (simulating crash during processing)
+            cursor.executemany('''
+                INSERT INTO documents (id, content, batch_id)
+                VALUES (?, ?, ?)
+            ''', [
+                ("partial_doc_1", "partial", "batch_006_partial"),
+                ("partial_doc_2", "partial", "batch_006_partial")
+            ])
         
         # Execute recovery
         result = recovery_setup["recovery_handler"].recover()
@@ -94,13 +90,16 @@ class TestRecoveryFlow:
         assert result.partial_batch_discarded is True
         assert result.data_loss == 0
         
-        # Verify partial batch cleaned up
-        cursor.execute("SELECT COUNT(*) FROM documents WHERE batch_id LIKE '%partial%'")
-        assert cursor.fetchone()[0] == 0
-        
-        # Verify committed batches intact
-        cursor.execute("SELECT COUNT(*) FROM documents WHERE batch_id NOT LIKE '%partial%'")
-        assert cursor.fetchone()[0] == 50
+        # Verify partial batch cleaned up and committed batches intact
+        cursor.execute('''
+            SELECT
+                COUNT(*) FILTER (WHERE batch_id LIKE '%partial%'),
+                COUNT(*) FILTER (WHERE batch_id NOT LIKE '%partial%')
+            FROM documents
+        ''')
+        partial_count, committed_count = cursor.fetchone()
+        assert partial_count == 0
+        assert committed_count == 50
     
     def test_recovery_from_corrupt_state(self, recovery_setup):
         """
@@ -139,6 +138,71 @@ class TestRecoveryFlow:
         assert result.resume_from is None
         assert result.can_resume is False
     
+    def test_recovery_sees_checkpoints_from_other_connections(self, tmp_path):
+        """
+        Two connections share one database file:
+        - B reads the checkpoint at batch_001
+        - A commits batch_002
+        - B's recovery must see batch_002 as committed, not partial
+        """
+        db_path = str(tmp_path / "shared.db")
+        conn_a = sqlite3.connect(db_path)
+        conn_b = sqlite3.connect(db_path)
+        try:
+            db_a = Database(conn_a)
+            db_b = Database(conn_b)
+            writer_a = StreamingBatchWriter(
+                db_connection=db_a,
+                checkpoint_manager=CheckpointManager(db_connection=db_a)
+            )
+            checkpoint_manager_b = CheckpointManager(db_connection=db_b)
+            recovery_handler_b = CrashRecoveryHandler(
+                checkpoint_manager=checkpoint_manager_b,
+                db_connection=db_b
+            )
+            
+            writer_a.process_batch([{"id": "doc1", "content": "one"}], "batch_001")
+            assert db_b.get_latest_checkpoint()["last_batch_id"] == "batch_001"
+            
+            writer_a.process_batch([{"id": "doc2", "content": "two"}], "batch_002")
+            result = recovery_handler_b.recover()
+            
+            assert db_b.get_latest_checkpoint()["last_batch_id"] == "batch_002"
+            assert result.partial_batch_discarded is False
+            assert db_a.get_document_count() == 2
+        finally:
+            conn_a.close()
+            conn_b.close()
+    
+    def test_partial_batch_discard_uses_index(self, recovery_setup):
+        """
+        Partial batch discard is an index search, not a table scan:
+        1. Checkpoint batch_005
+        2. Capture the DELETE that discard_partial_batch() runs
+        3. Verify its query plan only searches indexes
+        """
+        db = recovery_setup["db"]
+        cursor = recovery_setup["cursor"]
+        
+        with db:
+            cursor.execute('''
+                INSERT INTO checkpoints (last_batch_id, total_persisted, status)
+                VALUES (?, ?, ?)
+            ''', ("batch_005", 0, "committed"))
+        
+        statements = []
+        db.set_trace_callback(statements.append)
+        recovery_setup["db_wrapper"].discard_partial_batch()
+        db.set_trace_callback(None)
+        db.rollback()
+        
+        delete, = [sql for sql in statements if sql.lstrip().startswith("DELETE")]
+        cursor.execute("EXPLAIN QUERY PLAN " + delete)
+        plan = [row[3] for row in cursor.fetchall()]
+        
+        assert not any(step.startswith("SCAN") for step in plan), plan
+        assert any("idx_documents_batch_num" in step for step in plan), plan
+    
     def test_integrity_validation_after_recovery(self, recovery_setup):
         """
         Validate integrity after recovery:
@@ -151,16 +215,15 @@ class TestRecoveryFlow:
         cursor = recovery_setup["cursor"]
         
         # Setup committed data
-        for i in range(20):
-            cursor.execute('''
+        with db:
+            cursor.executemany('''
                 INSERT INTO documents (id, content, batch_id) VALUES (?, ?, ?)
-            ''', (f"doc_{i}", "content", "batch_001"))
+            ''', [(f"doc_{i}", "content", "batch_001") for i in range(20)])
         
-        cursor.execute('''
-            INSERT INTO checkpoints (last_batch_id, total_persisted, status)
-            VALUES (?, ?, ?)
-        ''', ("batch_001", 20, "committed"))
-        db.commit()
+            cursor.execute('''
+                INSERT INTO checkpoints (last_batch_id, total_persisted, status)
+                VALUES (?, ?, ?)
+            ''', ("batch_001", 20, "committed"))
         
         # Run recovery
         recovery_setup["recovery_handler"].recover()
@@ -184,20 +247,19 @@ class TestRecoveryFlow:
         cursor = recovery_setup["cursor"]
         
         # Setup committed data
-        for i in range(20):
-            cursor.execute('''
+        with db:
+            cursor.executemany('''
                 INSERT INTO documents (id, content, batch_id) VALUES (?, ?, ?)
-            ''', (f"doc_{i}", "content", "batch_001"))
+            ''', [(f"doc_{i}", "content", "batch_001") for i in range(20)])
         
-        cursor.execute('''
-            INSERT INTO checkpoints (last_batch_id, total_persisted, status)
-            VALUES (?, ?, ?)
-        ''', ("batch_001", 20, "committed"))
-        db.commit()
+            cursor.execute('''
+                INSERT INTO checkpoints (last_batch_id, total_persisted, status)
+                VALUES (?, ?, ?)
+            ''', ("batch_001", 20, "committed"))
         
         # Simulate corruption - delete some documents
-        cursor.execute("DELETE FROM documents WHERE id IN ('doc_1', 'doc_2', 'doc_3')")
-        db.commit()
+        with db:
+            cursor.execute("DELETE FROM documents WHERE id IN ('doc_1', 'doc_2', 'doc_3')")
         
         # Validate integrity
         report = recovery_setup["recovery_handler"].validate_integrity()
@@ -216,15 +278,7 @@ class TestCrashSimulation:
     @pytest.fixture
     def crash_simulator(self):
         """Create crash simulation environment"""
-        from docs_rag.checkpoint import CheckpointManager
-        from docs_rag.recovery import CrashRecoveryHandler
-        from docs_rag.streaming import StreamingBatchWriter
-        from docs_rag.database import Database
-        
-        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
-            db_path = f.name
-        
-        conn = sqlite3.connect(db_path)
+        conn = sqlite3.connect(':memory:')
         db = Database(conn)
         
         checkpoint_manager = CheckpointManager(db_connection=db)
@@ -246,8 +300,6 @@ class TestCrashSimulation:
         }
         
         conn.close()
-        import os
-        os.unlink(db_path)
     
     def test_crash_during_checkpoint_update(self, crash_simulator):
         """
@@ -269,6 +321,44 @@ class TestCrashSimulation:
         """
         pass
     
+    def test_recovery_keeps_committed_non_numeric_batches(self, crash_simulator):
+        """
+        Batches whose IDs carry no number are partial only if never checkpointed:
+        - Two such batches committed through the writer
+        - Recovery must not discard the earlier one
+        """
+        batch_writer = crash_simulator["batch_writer"]
+        recovery_handler = crash_simulator["recovery_handler"]
+        
+        batch_writer.process_batch([{"id": "intro", "content": "intro"}], "docs_intro")
+        batch_writer.process_batch([{"id": "api", "content": "api"}], "docs_api")
+        
+        result = recovery_handler.recover()
+        
+        assert result.success is True
+        assert result.partial_batch_discarded is False
+        assert crash_simulator["db_wrapper"].get_document_count() == 2
+        assert recovery_handler.validate_integrity().integrity == "full"
+    
+    def test_recovery_discards_uncheckpointed_non_numeric_batch(self, crash_simulator):
+        """
+        A batch with no number and no checkpoint is still discarded
+        """
+        db = crash_simulator["db"]
+        batch_writer = crash_simulator["batch_writer"]
+        
+        batch_writer.process_batch([{"id": "intro", "content": "intro"}], "docs_intro")
+        with db:
+            db.execute(
+                "INSERT INTO documents (id, content, batch_id) VALUES (?, ?, ?)",
+                ("api", "api", "docs_api")
+            )
+        
+        result = crash_simulator["recovery_handler"].recover()
+        
+        assert result.partial_batch_discarded is True
+        assert [row[0] for row in db.execute("SELECT id FROM documents")] == ["intro"]
+    
     def test_recovery_idempotency(self, crash_simulator):
         """
         Test that recovery is idempotent:
@@ -5,9 +5,55 @@ Tests interaction between StreamingBatchWriter, CheckpointManager, and Database
 """
 import pytest
 from unittest.mock import Mock, patch
-import tempfile
 import sqlite3
 
+from docs_rag.checkpoint import CheckpointManager
+from docs_rag.database import Database
+from docs_rag.parsers import MarkdownHeaderParser
+from docs_rag.recovery import CrashRecoveryHandler
+from docs_rag.streaming import StreamingBatchWriter
+
+
+def scalar(conn, sql, params=()):
+    """Run a single-value query on the connection and return the value"""
+    return conn.execute(sql, params).fetchone()[0]
+
+
+@pytest.fixture(scope="module")
+def pipeline_schema_template():
+    """
+    In-memory database holding the pipeline schema, built once per module.
+    """
+    template = sqlite3.connect(':memory:')
+    
+    # Create tables with full schema (matching Database class)
+    template.execute('''
+        CREATE TABLE documents (
+            id TEXT PRIMARY KEY,
+            content TEXT NOT NULL,
+            batch_id TEXT NOT NULL,
+            headers TEXT,
+            title TEXT,
+            sections TEXT,
+            metadata TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    template.execute('''
+        CREATE TABLE checkpoints (
+            id INTEGER PRIMARY KEY,
+            last_batch_id TEXT,
+            total_persisted INTEGER,
+            status TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    template.commit()
+    
+    yield template
+    
+    template.close()
+
 
 class TestStreamingPipeline:
     """
@@ -16,51 +62,18 @@ class TestStreamingPipeline:
     """
     
     @pytest.fixture
-    def temp_db(self):
-        """Create temporary SQLite database with full schema"""
-        with tempfile.NamedTemporaryFile(suffix='.db', delete=False) as f:
-            db_path = f.name
-        
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Create tables with full schema (matching Database class)
-        cursor.execute('''
-            CREATE TABLE documents (
-                id TEXT PRIMARY KEY,
-                content TEXT NOT NULL,
-                batch_id TEXT NOT NULL,
-                headers TEXT,
-                title TEXT,
-                sections TEXT,
-                metadata TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        cursor.execute('''
-            CREATE TABLE checkpoints (
-                id INTEGER PRIMARY KEY,
-                last_batch_id TEXT,
-                total_persisted INTEGER,
-                status TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        conn.commit()
+    def temp_db(self, pipeline_schema_template):
+        """Create in-memory SQLite database with full schema"""
+        conn = sqlite3.connect(':memory:')
+        pipeline_schema_template.backup(conn)
         
         yield conn
         
         conn.close()
-        import os
-        os.unlink(db_path)
     
     @pytest.fixture
     def pipeline(self, temp_db):
         """Create complete streaming pipeline with real components"""
-        from docs_rag.checkpoint import CheckpointManager
-        from docs_rag.streaming import StreamingBatchWriter
-        from docs_rag.database import Database
-        
         db = Database(temp_db)
         checkpoint_manager = CheckpointManager(db_connection=db)
         batch_writer = StreamingBatchWriter(
@@ -98,9 +111,7 @@ class TestStreamingPipeline:
         assert result.persisted_count == 10
         
         # Assert - Database persistence
-        cursor = pipeline["db"].cursor()
-        cursor.execute("SELECT COUNT(*) FROM documents WHERE batch_id = ?", (batch_id,))
-        count = cursor.fetchone()[0]
+        count = scalar(pipeline["db"], "SELECT COUNT(*) FROM documents WHERE batch_id = ?", (batch_id,))
         assert count == 10
         
         # Assert - Checkpoint updated
@@ -131,6 +142,155 @@ class TestStreamingPipeline:
         assert recovery_point.last_batch_id == "batch_2"
         assert recovery_point.total_persisted == 4
     
+    def test_process_batches_from_generator(self, pipeline):
+        """
+        Test streaming batches from a generator:
+        1. Produce batches lazily
+        2. Verify every batch persisted in order
+        3. Verify checkpoint reflects the last batch
+        """
+        def batches():
+            for b in range(5):
+                yield f"batch_{b:03d}", [
+                    {"id": f"b{b}_d{i}", "content": f"c{i}"} for i in range(10)
+                ]
+        
+        results = pipeline["batch_writer"].process_batches(batches(), prefetch=2)
+        
+        assert [r.batch_id for r in results] == [f"batch_{b:03d}" for b in range(5)]
+        assert all(r.success for r in results)
+        recovery_point = pipeline["checkpoint_manager"].get_recovery_point()
+        assert recovery_point.last_batch_id == "batch_004"
+        assert recovery_point.total_persisted == 50
+    
+    def test_process_batches_stops_at_failure(self, pipeline):
+        """
+        Test streaming stops at the first failed batch:
+        1. Produce a batch that conflicts with an earlier one
+        2. Verify later batches are not processed
+        3. Verify checkpoint stays at the last good batch
+        """
+        batches = [
+            ("batch_001", [{"id": "d1", "content": "c1"}]),
+            ("batch_002", [{"id": "d1", "content": "duplicate"}]),
+            ("batch_003", [{"id": "d3", "content": "c3"}])
+        ]
+        
+        results = pipeline["batch_writer"].process_batches(batches)
+        
+        assert [r.success for r in results] == [True, False]
+        assert pipeline["checkpoint_manager"].get_recovery_point().last_batch_id == "batch_001"
+    
+    @pytest.mark.parametrize("prefetch", [0, -1])
+    def test_process_batches_rejects_non_positive_prefetch(self, pipeline, prefetch):
+        """
+        Test prefetch below 1 is rejected before any batch is consumed
+        """
+        consumed = []
+        
+        def batches():
+            consumed.append(True)
+            yield "batch_001", [{"id": "d1", "content": "c1"}]
+        
+        with pytest.raises(ValueError, match="prefetch must be at least 1"):
+            pipeline["batch_writer"].process_batches(batches(), prefetch=prefetch)
+        
+        assert consumed == []
+        assert pipeline["checkpoint_manager"].get_recovery_point().last_batch_id is None
+    
+    def test_process_batches_producer_error(self, pipeline):
+        """
+        Test errors raised while producing batches reach the caller
+        """
+        def batches():
+            yield "batch_001", [{"id": "d1", "content": "c1"}]
+            raise RuntimeError("source unavailable")
+        
+        with pytest.raises(RuntimeError, match="source unavailable"):
+            pipeline["batch_writer"].process_batches(batches())
+        
+        assert pipeline["checkpoint_manager"].get_recovery_point().last_batch_id == "batch_001"
+    
+    def test_batch_commits_once(self, pipeline):
+        """
+        Test documents and checkpoint share one transaction:
+        1. Process a batch
+        2. Verify the database committed exactly once
+        """
+        db = pipeline["db_wrapper"]
+        docs = [{"id": f"d{i}", "content": f"c{i}"} for i in range(5)]
+        
+        with patch.object(db, "commit", wraps=db.commit) as commit:
+            pipeline["batch_writer"].process_batch(docs, "batch_001")
+        
+        commit.assert_called_once()
+    
+    def test_documents_committed_with_file_only_checkpoint_manager(self, tmp_path):
+        """
+        Test a manager that does not share the writer's connection:
+        1. Process a batch with a checkpoint-file-only manager
+        2. Reopen the database file
+        3. Verify the documents were committed
+        """
+        db_path = str(tmp_path / "docs.db")
+        db = Database(sqlite3.connect(db_path))
+        batch_writer = StreamingBatchWriter(
+            db_connection=db,
+            checkpoint_manager=CheckpointManager(checkpoint_file=str(tmp_path / "checkpoint.ckpt"))
+        )
+        
+        result = batch_writer.process_batch([{"id": "d1", "content": "c1"}], "batch_001")
+        db.close()
+        
+        reopened = sqlite3.connect(db_path)
+        try:
+            assert result.success is True
+            assert scalar(reopened, "SELECT COUNT(*) FROM documents") == 1
+        finally:
+            reopened.close()
+    
+    def test_batch_split_across_insert_statements(self, temp_db):
+        """
+        Test a batch larger than one multi-row INSERT:
+        1. Lower the bound-parameter limit to two rows per statement
+        2. Process an odd-sized batch
+        3. Verify the rows were split across three INSERTs and all persisted
+        """
+        # 16 bound parameters fit two 8-column document rows
+        temp_db.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 16)
+        db = Database(temp_db)
+        batch_writer = StreamingBatchWriter(
+            db_connection=db,
+            checkpoint_manager=CheckpointManager(db_connection=db)
+        )
+        statements = []
+        temp_db.set_trace_callback(statements.append)
+        
+        docs = [{"id": f"d{i}", "content": f"c{i}"} for i in range(5)]
+        result = batch_writer.process_batch(docs, "batch_001")
+        
+        temp_db.set_trace_callback(None)
+        inserts = [sql for sql in statements if "INSERT INTO documents" in sql]
+        assert result.success is True
+        assert [sql.count("'batch_001'") for sql in inserts] == [2, 2, 1]
+        assert scalar(temp_db, "SELECT COUNT(*) FROM documents WHERE batch_id = ?", ("batch_001",)) == 5
+    
+    def test_cumulative_count_continues_after_restart(self, pipeline):
+        """
+        Test a new CheckpointManager continues the persisted total:
+        1. Process batch with the original manager
+        2. Create a fresh manager on the same database
+        3. Verify its first checkpoint builds on the stored total
+        """
+        docs = [{"id": f"d{i}", "content": f"c{i}"} for i in range(3)]
+        pipeline["batch_writer"].process_batch(docs, "batch_001")
+        
+        restarted = CheckpointManager(db_connection=pipeline["db_wrapper"])
+        checkpoint = restarted.update_checkpoint("batch_002", 2)
+        
+        assert checkpoint.total_persisted == 5
+        assert restarted.get_recovery_point().total_persisted == 5
+    
     def test_batch_failure_rollback(self, pipeline):
         """
         Test that batch failure rolls back changes:
@@ -159,14 +319,38 @@ class TestStreamingPipeline:
         assert result.success is False
         
         # Assert - Original document still exists
-        cursor.execute("SELECT batch_id FROM documents WHERE id = ?", ("unique_doc",))
-        batch_id = cursor.fetchone()[0]
+        batch_id = scalar(pipeline["db"], "SELECT batch_id FROM documents WHERE id = ?", ("unique_doc",))
         assert batch_id == "old_batch"
         
         # Assert - Checkpoint not updated
         recovery_point = pipeline["checkpoint_manager"].get_recovery_point()
         assert recovery_point.last_batch_id != "batch_fail"
     
+    def test_batch_failure_discards_partial_rows(self, pipeline):
+        """
+        Test that a failure mid-batch leaves none of the batch behind:
+        1. Process batch whose last document conflicts
+        2. Verify earlier documents of the batch were rolled back
+        3. Verify next batch commits normally
+        """
+        pipeline["batch_writer"].process_batch(
+            [{"id": "keep", "content": "c"}], "batch_001"
+        )
+        
+        documents = [
+            {"id": "new_1", "content": "c1"},
+            {"id": "new_2", "content": "c2"},
+            {"id": "keep", "content": "duplicate"}
+        ]
+        result = pipeline["batch_writer"].process_batch(documents, "batch_002")
+        assert result.success is False
+        
+        assert scalar(pipeline["db"], "SELECT COUNT(*) FROM documents WHERE batch_id = ?", ("batch_002",)) == 0
+        
+        result = pipeline["batch_writer"].process_batch(documents[:2], "batch_003")
+        assert result.success is True
+        assert pipeline["checkpoint_manager"].verify_consistency().consistent is True
+    
     def test_checkpoint_consistency_verification(self, pipeline):
         """
         Test checkpoint consistency with actual database state:
@@ -203,13 +387,7 @@ class TestStreamingWithParserIntegration:
     @pytest.fixture
     def integrated_pipeline(self):
         """Create pipeline with parser integration"""
-        from docs_rag.streaming import StreamingBatchWriter
-        from docs_rag.checkpoint import CheckpointManager
-        from docs_rag.parsers import MarkdownHeaderParser
-        from docs_rag.database import Database
-        
         # Create in-memory database
-        import sqlite3
         conn = sqlite3.connect(':memory:')
         db = Database(conn)
         
@@ -262,10 +440,6 @@ class TestRecoveryFlowIntegration:
     @pytest.fixture
     def recovery_pipeline(self, initialized_database):
         """Create pipeline with recovery handler"""
-        from docs_rag.checkpoint import CheckpointManager
-        from docs_rag.recovery import CrashRecoveryHandler
-        from docs_rag.database import Database
-        
         db = Database(initialized_database)
         checkpoint_manager = CheckpointManager(db_connection=db)
         recovery_handler = CrashRecoveryHandler(
@@ -310,24 +484,25 @@ class TestRecoveryFlowIntegration:
         3. Run recovery
         4. Verify batch 5 discarded, resume from 5
         """
+        db = recovery_pipeline["db"]
+        cursor = db.cursor()
+        
         # Simulate committed batches 1-4
-        cursor = recovery_pipeline["db"].cursor()
-        for i in range(1, 5):
-            cursor.execute('''
+        with db:
+            cursor.executemany('''
                 INSERT INTO documents (id, content, batch_id) VALUES (?, ?, ?)
-            ''', (f"doc_{i}", f"content_{i}", f"batch_{i}"))
-        
-        cursor.execute('''
-            INSERT INTO checkpoints (last_batch_id, total_persisted, status)
-            VALUES (?, ?, ?)
-        ''', ("batch_004", 400, "committed"))
-        recovery_pipeline["db"].commit()
+            ''', [(f"doc_{i}", f"content_{i}", f"batch_{i}") for i in range(1, 5)])
+            
+            cursor.execute('''
+                INSERT INTO checkpoints (last_batch_id, total_persisted, status)
+                VALUES (?, ?, ?)
+            ''', ("batch_004", 400, "committed"))
         
         # Simulate partial batch 5 (not in checkpoint but has documents)
-        cursor.execute('''
-            INSERT INTO documents (id, content, batch_id) VALUES (?, ?, ?)
-        ''', ("partial_doc", "partial_content", "batch_5_partial"))
-        recovery_pipeline["db"].commit()
+        with db:
+            cursor.execute('''
+                INSERT INTO documents (id, content, batch_id) VALUES (?, ?, ?)
+            ''', ("partial_doc", "partial_content", "batch_5_partial"))
         
         # Run recovery
         result = recovery_pipeline["recovery_handler"].recover()
@@ -337,6 +512,5 @@ class TestRecoveryFlowIntegration:
         assert result.resume_from == "batch_005"
         
         # Verify partial batch cleaned up
-        cursor.execute("SELECT COUNT(*) FROM documents WHERE batch_id = ?", ("batch_5_partial",))
-        count = cursor.fetchone()[0]
+        count = scalar(db, "SELECT COUNT(*) FROM documents WHERE batch_id = ?", ("batch_5_partial",))
         assert count == 0  # Partial batch discarded
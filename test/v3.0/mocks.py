@@ -2,8 +2,71 @@
 Mock implementations for testing docs-rag v3.0
 Use these before real implementations exist (RED phase)
 """
-from unittest.mock import Mock, MagicMock
-from types import SimpleNamespace
+from dataclasses import dataclass, field
+from typing import List, Optional
+import re
+
+
+# Any run of '#' at the start of a line, after optional indentation; lines
+# without one are skipped by the regex engine
+_MOCK_HEADER_RE = re.compile(r'^[^\S\n]*(#+)(.*)', re.MULTILINE)
+
+
+# Result types returned by the mocks, shaped like their docs_rag counterparts
+
+@dataclass(slots=True)
+class MockCheckpoint:
+    last_batch_id: Optional[str]
+    total_persisted: int
+    status: str = 'committed'
+    db_count_matches: bool = True
+
+
+@dataclass(slots=True)
+class MockRecoveryPoint:
+    last_batch_id: Optional[str]
+    total_persisted: int
+    can_resume: bool
+    resume_from: Optional[str] = None
+
+
+@dataclass(slots=True)
+class MockConsistencyReport:
+    consistent: bool
+    discrepancies: List[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class MockHeader:
+    level: int
+    text: str
+    anchor: Optional[str] = None
+    has_link: bool = False
+
+
+@dataclass(slots=True)
+class MockRecoveryResult:
+    success: bool
+    recovered_batches: int = 0
+    resume_from: Optional[str] = None
+    data_loss: Optional[int] = 0
+    partial_batch_discarded: bool = False
+    error: Optional[str] = None
+
+
+@dataclass(slots=True)
+class MockIntegrityReport:
+    success: bool
+    integrity: str
+    issues: List[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class MockBatchResult:
+    success: bool
+    persisted_count: int
+    batch_id: str
+    checkpoint_updated: bool
 
 
 class MockDatabase:
@@ -67,37 +130,40 @@ class MockCheckpointManager:
     def __init__(self):
         self.checkpoints = []
         self._consistency = True
+        self._resume_from = None
     
     def update_checkpoint(self, batch_id, persisted_count, metadata=None):
         """Mock checkpoint update"""
-        checkpoint = SimpleNamespace(
+        checkpoint = MockCheckpoint(
             last_batch_id=batch_id,
             total_persisted=persisted_count,
             status='committed',
             db_count_matches=True
         )
         self.checkpoints.append(checkpoint)
+        # Parsed once per update rather than on every recovery lookup
+        self._resume_from = self._next_batch_id(batch_id)
         return checkpoint
     
     def get_recovery_point(self):
         """Mock recovery point retrieval"""
         if not self.checkpoints:
-            return SimpleNamespace(
+            return MockRecoveryPoint(
                 last_batch_id=None,
                 total_persisted=0,
                 can_resume=False
             )
         latest = self.checkpoints[-1]
-        return SimpleNamespace(
+        return MockRecoveryPoint(
             last_batch_id=latest.last_batch_id,
             total_persisted=latest.total_persisted,
             can_resume=True,
-            resume_from=self._next_batch_id(latest.last_batch_id)
+            resume_from=self._resume_from
         )
     
     def verify_consistency(self):
         """Mock consistency verification"""
-        return SimpleNamespace(
+        return MockConsistencyReport(
             consistent=self._consistency,
             discrepancies=[] if self._consistency else ["checkpoint: 100, db: 95"]
         )
@@ -128,25 +194,23 @@ class MockMarkdownParser:
         """Mock header parsing"""
         # Simple mock implementation
         headers = []
-        for line in content.split('\n'):
-            line = line.strip()
-            if line.startswith('#'):
-                level = len(line) - len(line.lstrip('#'))
-                text = line.lstrip('#').strip()
-                
-                # Extract anchor if present
-                anchor = None
-                if '{#' in text:
-                    parts = text.split('{#')
-                    text = parts[0].strip()
-                    anchor = parts[1].rstrip('}')
-                
-                headers.append(SimpleNamespace(
-                    level=level,
-                    text=text,
-                    anchor=anchor,
-                    has_link='[' in text and '](' in text
-                ))
+        for match in _MOCK_HEADER_RE.finditer(content):
+            hashes, text = match.groups()
+            text = text.strip()
+            
+            # Extract anchor if present
+            anchor = None
+            if '{#' in text:
+                text, _, anchor = text.partition('{#')
+                text = text.strip()
+                anchor = anchor.rstrip('}')
+            
+            headers.append(MockHeader(
+                level=len(hashes),
+                text=text,
+                anchor=anchor,
+                has_link='](' in text and '[' in text
+            ))
         return headers
     
     def extract_header_metadata(self, content):
@@ -179,7 +243,7 @@ class MockRecoveryHandler:
     def recover(self):
         """Mock recovery process"""
         if self._should_fail:
-            return SimpleNamespace(
+            return MockRecoveryResult(
                 success=False,
                 error="Recovery failed",
                 data_loss=None
@@ -188,7 +252,7 @@ class MockRecoveryHandler:
         recovery_point = self.checkpoint_manager.get_recovery_point()
         
         if not recovery_point.can_resume:
-            return SimpleNamespace(
+            return MockRecoveryResult(
                 success=True,
                 recovered_batches=0,
                 resume_from=None,
@@ -198,7 +262,7 @@ class MockRecoveryHandler:
         # Mock recovered batches calculation
         batch_num = int(recovery_point.last_batch_id.split('_')[1])
         
-        return SimpleNamespace(
+        return MockRecoveryResult(
             success=True,
             recovered_batches=batch_num,
             resume_from=recovery_point.resume_from,
@@ -208,7 +272,7 @@ class MockRecoveryHandler:
     
     def validate_integrity(self):
         """Mock integrity validation"""
-        return SimpleNamespace(
+        return MockIntegrityReport(
             success=True,
             integrity="full",
             issues=[]
@@ -219,6 +283,34 @@ class MockRecoveryHandler:
         self._should_fail = should_fail
 
 
+class MockBatchWriter:
+    """
+    Mock batch writer that reports every batch as persisted.
+    
+    Each call's arguments are recorded in order: (documents, batch_id)
+    pairs in processed, batch IDs in committed.
+    """
+    
+    def __init__(self):
+        self.processed = []
+        self.committed = []
+    
+    def process_batch(self, documents, batch_id):
+        """Mock batch processing; returns a fresh result per call"""
+        self.processed.append((documents, batch_id))
+        return MockBatchResult(
+            success=True,
+            persisted_count=100,
+            batch_id="mock_batch",
+            checkpoint_updated=True
+        )
+    
+    def commit_batch(self, batch_id):
+        """Mock batch commit"""
+        self.committed.append(batch_id)
+        return True
+
+
 def create_mock_streaming_pipeline():
     """
     Factory function to create a fully mocked streaming pipeline.
@@ -227,15 +319,7 @@ def create_mock_streaming_pipeline():
     db = MockDatabase()
     checkpoint_manager = MockCheckpointManager()
     
-    # Create a mock batch writer
-    batch_writer = Mock()
-    batch_writer.process_batch = Mock(return_value=SimpleNamespace(
-        success=True,
-        persisted_count=100,
-        batch_id="mock_batch",
-        checkpoint_updated=True
-    ))
-    batch_writer.commit_batch = Mock(return_value=True)
+    batch_writer = MockBatchWriter()
     
     return {
         "db": db,
@@ -0,0 +1,36 @@
+"""
+Fixtures for the docs-rag v3.0 unit tests
+"""
+import pytest
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from docs_rag.checkpoint import CheckpointManager
+from docs_rag.streaming import StreamingBatchWriter
+
+
+@pytest.fixture
+def mock_db():
+    """Mock database connection"""
+    return Mock()
+
+
+@pytest.fixture
+def mock_checkpoint_manager():
+    """Mock checkpoint manager limited to the CheckpointManager interface"""
+    cm = Mock(spec=CheckpointManager)
+    cm.update_checkpoint.return_value = SimpleNamespace(
+        last_batch_id="batch_001",
+        total_persisted=2,
+        status="committed"
+    )
+    return cm
+
+
+@pytest.fixture
+def batch_writer(mock_db, mock_checkpoint_manager):
+    """Create StreamingBatchWriter instance with mocked dependencies"""
+    return StreamingBatchWriter(
+        db_connection=mock_db,
+        checkpoint_manager=mock_checkpoint_manager
+    )
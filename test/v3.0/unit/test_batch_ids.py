@@ -0,0 +1,53 @@
+"""
+Unit tests for batch ID parsing
+TDD Level: Interface Contract Tests
+"""
+import pytest
+
+
+class TestParseBatchNum:
+    """Tests for parse_batch_num shared by checkpointing and recovery"""
+    
+    @pytest.mark.parametrize("batch_id, expected", [
+        ("batch_005", 5),
+        ("batch_1", 1),
+        ("batch_006_partial", 6),
+        ("batch_5_partial", 5),
+    ])
+    def test_parse_known_format(self, batch_id, expected):
+        """Numbered batch IDs parse to their number"""
+        from docs_rag.batch_ids import parse_batch_num
+        
+        assert parse_batch_num(batch_id) == expected
+    
+    @pytest.mark.parametrize("batch_id", [
+        None,
+        "",
+        "batch_",
+        "batch_docs",
+        "batch_md_001",
+        "batch_integration_001",
+    ])
+    def test_parse_unknown_format(self, batch_id):
+        """IDs outside the batch_NNN format parse to None"""
+        from docs_rag.batch_ids import parse_batch_num
+        
+        assert parse_batch_num(batch_id) is None
+
+
+class TestParseCommittedBatchNum:
+    """Tests for parse_committed_batch_num used for resume points"""
+    
+    @pytest.mark.parametrize("batch_id, expected", [
+        ("batch_005", 5),
+        ("batch_1", 1),
+        ("batch_006_partial", None),
+        ("batch_md_001", None),
+        ("batch_docs", None),
+        (None, None),
+    ])
+    def test_parse(self, batch_id, expected):
+        """Only committed batch_NNN IDs parse to their number"""
+        from docs_rag.batch_ids import parse_committed_batch_num
+        
+        assert parse_committed_batch_num(batch_id) == expected
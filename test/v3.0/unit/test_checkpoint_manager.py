@@ -13,11 +13,21 @@ class TestCheckpointManager:
     
     @pytest.fixture
     def mock_db(self):
-        """Mock database connection"""
-        db = Mock()
+        """Mock database connection without the single-statement checkpoint helpers"""
+        db = Mock(spec=[
+            "save_checkpoint", "get_latest_checkpoint", "get_document_count", "commit"
+        ])
         db.get_document_count.return_value = 100
         return db
     
+    @pytest.fixture
+    def incremental_db(self):
+        """Mock database connection with the single-statement checkpoint helpers"""
+        db = Mock()
+        db.save_checkpoint_incremental.return_value = 150
+        db.get_document_count.return_value = 150
+        return db
+    
     @pytest.fixture
     def checkpoint_manager(self, mock_db):
         """Create CheckpointManager instance"""
@@ -46,6 +56,24 @@ class TestCheckpointManager:
         assert checkpoint.status == "committed"
         mock_db.save_checkpoint.assert_called_once()
     
+    def test_update_checkpoint_incremental(self, incremental_db):
+        """Connections with save_checkpoint_incremental compute the total in one call"""
+        from docs_rag.checkpoint import CheckpointManager
+        checkpoint_manager = CheckpointManager(db_connection=incremental_db)
+        
+        checkpoint = checkpoint_manager.update_checkpoint(
+            "batch_002", 50, verify_db_state=True
+        )
+        
+        incremental_db.save_checkpoint_incremental.assert_called_once_with(
+            "batch_002", 50, "committed"
+        )
+        incremental_db.commit.assert_called_once()
+        incremental_db.save_checkpoint.assert_not_called()
+        incremental_db.get_latest_checkpoint.assert_not_called()
+        assert checkpoint.total_persisted == 150
+        assert checkpoint.db_count_matches is True
+    
     # =========================================================================
     # Test Case CPM-002: Checkpoint tracks actual DB state
     # =========================================================================
@@ -137,6 +165,23 @@ class TestCheckpointManager:
         assert len(report.discrepancies) > 0
         assert "checkpoint: 100, db: 95" in report.discrepancies[0]
     
+    @pytest.mark.parametrize("snapshot,consistent", [
+        pytest.param((150, 150), True, id="match"),
+        pytest.param((140, 150), False, id="missing"),
+        pytest.param((0, None), True, id="no_checkpoint"),
+    ])
+    def test_verify_consistency_snapshot(self, incremental_db, snapshot, consistent):
+        """Connections with get_consistency_snapshot are checked in one call"""
+        from docs_rag.checkpoint import CheckpointManager
+        incremental_db.get_consistency_snapshot.return_value = snapshot
+        
+        report = CheckpointManager(db_connection=incremental_db).verify_consistency()
+        
+        assert report.consistent is consistent
+        incremental_db.get_consistency_snapshot.assert_called_once()
+        incremental_db.get_latest_checkpoint.assert_not_called()
+        incremental_db.get_document_count.assert_not_called()
+    
     # =========================================================================
     # Additional Edge Cases
     # =========================================================================
@@ -176,6 +221,92 @@ class TestCheckpointManager:
             checkpoint_manager.update_checkpoint("batch_002", 200)
 
 
+class TestCheckpointFile:
+    """Tests for the binary checkpoint file written alongside the DB"""
+    
+    @pytest.fixture
+    def checkpoint_path(self, tmp_path):
+        return str(tmp_path / "checkpoint.ckpt")
+    
+    def test_checkpoint_file_written(self, checkpoint_path):
+        """Checkpoint file reflects the latest update"""
+        from docs_rag.checkpoint import CheckpointManager
+        manager = CheckpointManager(checkpoint_file=checkpoint_path)
+        
+        manager.update_checkpoint("batch_001", 10)
+        manager.update_checkpoint("batch_002", 5)
+        
+        checkpoint = CheckpointManager(checkpoint_file=checkpoint_path).load_checkpoint_file()
+        assert checkpoint.last_batch_id == "batch_002"
+        assert checkpoint.total_persisted == 15
+    
+    def test_recovery_point_from_file(self, checkpoint_path):
+        """A new manager resumes from the checkpoint file alone"""
+        from docs_rag.checkpoint import CheckpointManager
+        CheckpointManager(checkpoint_file=checkpoint_path).update_checkpoint("batch_003", 30)
+        
+        point = CheckpointManager(checkpoint_file=checkpoint_path).get_recovery_point()
+        
+        assert point.last_batch_id == "batch_003"
+        assert point.resume_from == "batch_004"
+    
+    def test_legacy_json_file_loaded(self, checkpoint_path):
+        """JSON checkpoint files from older versions are still readable"""
+        import json
+        from docs_rag.checkpoint import CheckpointManager
+        with open(checkpoint_path, "w") as f:
+            json.dump({"last_batch_id": "batch_002", "total_persisted": 20,
+                       "status": "committed"}, f)
+        
+        checkpoint = CheckpointManager(checkpoint_file=checkpoint_path).load_checkpoint_file()
+        
+        assert checkpoint.last_batch_id == "batch_002"
+        assert checkpoint.total_persisted == 20
+    
+    def test_truncated_file_is_corrupt(self, checkpoint_path):
+        """Truncated binary records are reported as corrupt"""
+        from docs_rag.checkpoint import CheckpointManager, CorruptCheckpointError
+        manager = CheckpointManager(checkpoint_file=checkpoint_path)
+        manager.update_checkpoint("batch_001", 10)
+        with open(checkpoint_path, "r+b") as f:
+            f.truncate(8)
+        
+        with pytest.raises(CorruptCheckpointError):
+            manager.load_checkpoint_file()
+    
+    def test_per_batch_update_skips_fsync(self, checkpoint_path):
+        """Default updates do not fsync"""
+        from docs_rag.checkpoint import CheckpointManager
+        manager = CheckpointManager(checkpoint_file=checkpoint_path)
+        
+        with patch("docs_rag.checkpoint.os.fsync") as fsync:
+            manager.update_checkpoint("batch_001", 10)
+        
+        fsync.assert_not_called()
+    
+    def test_durable_update_fsyncs_file_and_directory(self, checkpoint_path):
+        """Durable updates fsync the temp file and the containing directory"""
+        from docs_rag.checkpoint import CheckpointManager
+        manager = CheckpointManager(checkpoint_file=checkpoint_path)
+        
+        with patch("docs_rag.checkpoint.os.fsync") as fsync:
+            manager.update_checkpoint("batch_001", 10, durable=True)
+        
+        assert fsync.call_count == 2
+    
+    def test_durable_update_without_directory_fsync(self, checkpoint_path, monkeypatch):
+        """Platforms without os.O_DIRECTORY fsync only the file"""
+        from docs_rag.checkpoint import CheckpointManager
+        monkeypatch.delattr("docs_rag.checkpoint.os.O_DIRECTORY", raising=False)
+        manager = CheckpointManager(checkpoint_file=checkpoint_path)
+        
+        with patch("docs_rag.checkpoint.os.fsync") as fsync:
+            manager.update_checkpoint("batch_001", 10, durable=True)
+        
+        assert fsync.call_count == 1
+        assert manager.load_checkpoint_file().last_batch_id == "batch_001"
+
+
 class TestCheckpoint:
     """Tests for Checkpoint data structure"""
     
@@ -225,6 +356,29 @@ class TestCheckpoint:
         assert checkpoint.last_batch_id == "batch_002"
         assert checkpoint.total_persisted == 200
         assert checkpoint.status == "pending"
+    
+    def test_checkpoint_timestamp_round_trip(self):
+        """Test timestamp survives serialization and legacy ISO input"""
+        from docs_rag.checkpoint import Checkpoint
+        
+        created = datetime(2026, 2, 14, 10, 0, 0, 123456)
+        checkpoint = Checkpoint(
+            last_batch_id="batch_001",
+            total_persisted=100,
+            status="committed",
+            timestamp=created
+        )
+        
+        assert checkpoint.timestamp == created
+        assert Checkpoint.from_dict(checkpoint.to_dict()).timestamp == created
+        
+        legacy = {
+            "last_batch_id": "batch_001",
+            "total_persisted": 100,
+            "status": "committed",
+            "timestamp": created.isoformat()
+        }
+        assert Checkpoint.from_dict(legacy).timestamp_ns == checkpoint.timestamp_ns
 
 
 class TestRecoveryPoint:
@@ -262,6 +416,17 @@ class TestRecoveryPoint:
         )
         
         assert point.resume_from == "batch_006"
+    
+    def test_recovery_point_partial_batch_has_no_resume(self):
+        """A partial batch ID is not a resume point"""
+        from docs_rag.checkpoint import RecoveryPoint
+        
+        point = RecoveryPoint(
+            last_batch_id="batch_006_partial",
+            total_persisted=500
+        )
+        
+        assert point.resume_from is None
 
 
 class TestConsistencyReport:
@@ -76,6 +76,27 @@ class TestCrashRecoveryHandler:
         assert result.recovered_batches == 4
         assert result.partial_batch_discarded is True
         assert result.resume_from == "batch_005"
+        mock_db.discard_partial_batch.assert_called_once()
+        mock_db.commit.assert_called_once()
+    
+    def test_recover_without_partial_batch_discards_nothing(
+        self, recovery_handler, mock_checkpoint_manager, mock_db
+    ):
+        """Recovery only discards after the probe finds a partial batch"""
+        mock_checkpoint_manager.get_recovery_point.return_value = Mock(
+            last_batch_id="batch_004",
+            total_persisted=400,
+            can_resume=True,
+            resume_from="batch_005"
+        )
+        mock_db.has_partial_batch.return_value = False
+        
+        result = recovery_handler.recover()
+        
+        assert result.success is True
+        assert result.partial_batch_discarded is False
+        mock_db.discard_partial_batch.assert_not_called()
+        mock_db.commit.assert_not_called()
     
     # =========================================================================
     # Test Case CRH-003: Full integrity verified
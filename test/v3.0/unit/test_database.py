@@ -0,0 +1,46 @@
+"""
+Unit tests for Database JSON handling
+TDD Level: Interface Contract Tests
+"""
+import importlib
+import sqlite3
+import sys
+
+import pytest
+
+
+class TestJsonFallback:
+    """Tests for the stdlib json codec used when orjson is not installed"""
+    
+    @pytest.fixture
+    def database_without_orjson(self, monkeypatch):
+        """Reload docs_rag.database with orjson unavailable, restoring it afterwards"""
+        import docs_rag.database
+        
+        monkeypatch.setitem(sys.modules, "orjson", None)
+        yield importlib.reload(docs_rag.database)
+        
+        monkeypatch.undo()
+        importlib.reload(docs_rag.database)
+    
+    def test_fallback_codec_selected(self, database_without_orjson):
+        """Without orjson, the module falls back to compact stdlib json"""
+        assert database_without_orjson.orjson is None
+        assert database_without_orjson._dumps({"a": [1, 2]}) == '{"a":[1,2]}'
+        assert database_without_orjson._loads('{"a":[1,2]}') == {"a": [1, 2]}
+    
+    def test_fallback_round_trips_documents(self, database_without_orjson):
+        """Headers and metadata survive a write and read with the fallback codec"""
+        db = database_without_orjson.Database(sqlite3.connect(':memory:'))
+        headers = [{"level": 1, "text": "Title", "anchor": None}]
+        metadata = {"title": "Title", "sections": ["Intro"]}
+        
+        db.insert_documents(
+            [{"id": "doc1", "content": "c", "headers": headers, "metadata": metadata}],
+            "batch_001"
+        )
+        doc, = db.get_documents_by_batch("batch_001")
+        db.close()
+        
+        assert doc["headers"] == headers
+        assert doc["metadata"] == metadata
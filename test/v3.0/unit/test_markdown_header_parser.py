@@ -92,6 +92,31 @@ Content here.
         assert "Introduction" in metadata["sections"]
         assert "Conclusion" in metadata["sections"]
     
+    def test_parse_returns_headers_and_metadata(self, parser):
+        """parse() yields the same headers and metadata as the separate calls"""
+        content = """# Document Title
+## Introduction
+### Detail
+## Conclusion"""
+
+        result = parser.parse(content)
+        
+        assert list(result.headers) == parser.parse_headers(content)
+        assert result.metadata == {
+            "title": "Document Title",
+            "sections": ["Introduction", "Conclusion"]
+        }
+    
+    def test_parse_results_are_independent_copies(self, parser):
+        """Mutating a returned list does not affect later calls"""
+        content = "# Title\n## Section"
+        
+        parser.parse_headers(content).clear()
+        parser.extract_header_metadata(content)["sections"].clear()
+        
+        assert len(parser.parse_headers(content)) == 2
+        assert parser.extract_header_metadata(content)["sections"] == ["Section"]
+    
     # =========================================================================
     # Additional Edge Cases
     # =========================================================================
@@ -3,40 +3,13 @@ Unit tests for StreamingBatchWriter
 TDD Level: Interface Contract Tests
 """
 import pytest
-from unittest.mock import Mock, patch, MagicMock
-from datetime import datetime
-from docs_rag.streaming import BatchNotFoundError
+from unittest.mock import patch
+from docs_rag.streaming import BatchNotFoundError, BatchResult
 
 
 class TestStreamingBatchWriter:
     """Test suite for StreamingBatchWriter - per-batch persistence tests"""
     
-    @pytest.fixture
-    def mock_db(self):
-        """Mock database connection"""
-        return Mock()
-    
-    @pytest.fixture
-    def mock_checkpoint_manager(self):
-        """Mock checkpoint manager"""
-        cm = Mock()
-        cm.update_checkpoint.return_value = Mock(
-            last_batch_id="batch_001",
-            total_persisted=2,
-            status="committed"
-        )
-        return cm
-    
-    @pytest.fixture
-    def batch_writer(self, mock_db, mock_checkpoint_manager):
-        """Create StreamingBatchWriter instance with mocked dependencies"""
-        # Import will fail initially (RED phase)
-        from docs_rag.streaming import StreamingBatchWriter
-        return StreamingBatchWriter(
-            db_connection=mock_db,
-            checkpoint_manager=mock_checkpoint_manager
-        )
-    
     # =========================================================================
     # Test Case SBW-001: Valid batch processing
     # =========================================================================
@@ -96,7 +69,7 @@ class TestStreamingBatchWriter:
         """SBW-004: Successfully commit a pending batch"""
         # Arrange
         batch_id = "batch_001"
-        batch_writer._pending_batches[batch_id] = Mock()
+        batch_writer._pending_batches[batch_id] = object()
         
         # Act
         result = batch_writer.commit_batch(batch_id)
@@ -110,7 +83,6 @@ class TestStreamingBatchWriter:
     # =========================================================================
     def test_commit_batch_not_found(self, batch_writer):
         """SBW-005: Committing non-existent batch raises BatchNotFoundError"""
-        from docs_rag.streaming import BatchNotFoundError
         # Arrange
         batch_id = "batch_999"
         
@@ -122,62 +94,38 @@ class TestStreamingBatchWriter:
 class TestBatchResult:
     """Tests for BatchResult data structure"""
     
-    def test_batch_result_creation(self):
-        """Test BatchResult can be created with all fields"""
-        from docs_rag.streaming import BatchResult
-        
-        result = BatchResult(
-            success=True,
-            persisted_count=10,
-            batch_id="batch_001",
-            checkpoint_updated=True
-        )
-        
-        assert result.success is True
-        assert result.persisted_count == 10
-        assert result.batch_id == "batch_001"
-        assert result.checkpoint_updated is True
-    
-    def test_batch_result_failure(self):
-        """Test BatchResult for failure case"""
-        from docs_rag.streaming import BatchResult
-        
-        result = BatchResult(
-            success=False,
-            persisted_count=0,
-            batch_id="batch_002",
-            error="DatabaseError: connection lost"
-        )
+    @pytest.mark.parametrize("fields", [
+        pytest.param({
+            "success": True,
+            "persisted_count": 10,
+            "batch_id": "batch_001",
+            "checkpoint_updated": True
+        }, id="success"),
+        pytest.param({
+            "success": False,
+            "persisted_count": 0,
+            "batch_id": "batch_002",
+            "error": "DatabaseError: connection lost"
+        }, id="failure"),
+    ])
+    def test_batch_result_fields(self, fields):
+        """BatchResult exposes every field it was created with"""
+        result = BatchResult(**fields)
         
-        assert result.success is False
-        assert result.persisted_count == 0
-        assert "DatabaseError" in str(result.error)
+        for name, value in fields.items():
+            assert getattr(result, name) == value, name
 
 
 class TestDocumentValidation:
     """Tests for document validation within batches"""
     
-    @pytest.fixture
-    def batch_writer(self, mock_db, mock_checkpoint_manager):
-        """Create StreamingBatchWriter instance with mocked dependencies"""
-        from docs_rag.streaming import StreamingBatchWriter
-        return StreamingBatchWriter(
-            db_connection=mock_db,
-            checkpoint_manager=mock_checkpoint_manager
-        )
-    
-    def test_document_requires_id(self, batch_writer):
-        """Documents must have an ID field"""
-        documents = [{"content": "no id"}]
-        
-        with pytest.raises(ValueError, match="Document missing required field: id"):
-            batch_writer.process_batch(documents, "batch_001")
-    
-    def test_document_requires_content(self, batch_writer):
-        """Documents must have a content field"""
-        documents = [{"id": "doc1"}]
-        
-        with pytest.raises(ValueError, match="Document missing required field: content"):
+    @pytest.mark.parametrize("documents,field", [
+        pytest.param([{"content": "no id"}], "id", id="requires_id"),
+        pytest.param([{"id": "doc1"}], "content", id="requires_content"),
+    ])
+    def test_document_requires_field(self, batch_writer, documents, field):
+        """Documents must have ID and content fields"""
+        with pytest.raises(ValueError, match=f"Document missing required field: {field}"):
             batch_writer.process_batch(documents, "batch_001")
     
     def test_batch_id_uniqueness(self, batch_writer):
@@ -187,3 +135,13 @@ class TestDocumentValidation:
         
         with pytest.raises(ValueError, match="Batch ID already exists"):
             batch_writer.process_batch(documents, "batch_001")
+    
+    def test_batch_id_tracking_is_bounded(self, batch_writer):
+        """Only the most recent batch IDs are kept for duplicate detection"""
+        documents = [{"id": "doc1", "content": "test"}]
+        
+        with patch("docs_rag.streaming._MAX_TRACKED_BATCH_IDS", 2):
+            for batch_id in ("batch_001", "batch_002", "batch_003"):
+                batch_writer.process_batch(documents, batch_id)
+        
+        assert list(batch_writer._processed_batch_ids) == ["batch_002", "batch_003"]